@@ -99,6 +99,39 @@ else:
 
 
 
+# Cache
+# Set REDIS_URL in production so every worker shares one cache (and sees
+# invalidations); without it each process keeps its own in-memory cache.
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Write buffers (see quizzes/buffers.py) need a Redis that never evicts keys
+# (maxmemory-policy noeviction), so keep it apart from the LRU cache above.
+# Without WRITE_BUFFER_REDIS_URL buffered rows are inserted one at a time.
+
+WRITE_BUFFER_REDIS_URL = os.getenv("WRITE_BUFFER_REDIS_URL")
+
+if WRITE_BUFFER_REDIS_URL:
+    CACHES['write_buffers'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': WRITE_BUFFER_REDIS_URL,
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -145,4 +178,46 @@ LOGOUT_REDIRECT_URL = '/' # Redirect to the test list after logout
 LOGIN_URL = '/accounts/login/' # Default URL for the login page
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# AI feedback cache (identical score profiles reuse one Gemini report)
+FEEDBACK_CACHE_TTL = 60 * 60 * 24 * 30     # seconds
+FEEDBACK_CACHE_MAX_ENTRIES = 10000         # LRU-evicted beyond this
+
+# Gemini client (see quizzes/ai_client.py)
+GEMINI_DEADLINE = 20              # seconds per feedback request, retries included
+GEMINI_MAX_RETRIES = 2
+GEMINI_BACKOFF_BASE = 0.5         # seconds, doubled per retry (full jitter)
+GEMINI_BREAKER_THRESHOLD = 5      # consecutive failures before the circuit opens
+GEMINI_BREAKER_RESET = 60         # seconds before a trial call is allowed
+
+# Test blueprints (see quizzes/blueprint.py); keyed by the test's content
+# version, so the timeout only bounds how long retired versions linger
+BLUEPRINT_CACHE_TIMEOUT = 60 * 60        # seconds
+
+# Certificates (see quizzes/certificates.py). SITE_URL is encoded in the
+# verification QR code, so set it to the public origin in production.
+SITE_URL = os.getenv("SITE_URL", "http://localhost:8000")
+CERTIFICATE_VERIFY_CACHE_TIMEOUT = 60 * 60 * 24   # seconds
+
+# User dashboard (see quizzes/dashboard.py); stats are invalidated when an
+# attempt completes, the timeout only bounds staleness elsewhere
+DASHBOARD_CACHE_TIMEOUT = 60 * 15         # seconds
+
+# Leaderboards (see quizzes/rankings.py); refreshed when a score enters the top N
+LEADERBOARD_CACHE_TIMEOUT = 60 * 5        # seconds
+
+# Practice puzzle pools (see quizzes/practice.py); refilled by
+# manage.py refill_puzzle_pools, this only bounds how stale a pool size is
+PRACTICE_POOL_CACHE_TIMEOUT = 60 * 10     # seconds
+
+# Write buffers (see quizzes/buffers.py): with WRITE_BUFFER_REDIS_URL set,
+# high-frequency rows are held in Redis and bulk-inserted once this many are
+# pending or the oldest is this old. Run manage.py flush_write_buffers from
+# cron so quiet periods still flush.
+WRITE_BUFFER_MAX_ITEMS = 50
+WRITE_BUFFER_MAX_AGE = 30                 # seconds
+
+# Practice stats (see quizzes/practice.py); refreshed when buffered answers
+# are flushed, the timeout only bounds staleness elsewhere
+PRACTICE_STATS_CACHE_TIMEOUT = 60 * 15    # seconds
@@ -0,0 +1,127 @@
+# quizzes/ai_client.py
+
+import os
+import random
+import threading
+import time
+
+import google.generativeai as genai
+from django.conf import settings
+
+GEMINI_MODEL = "gemini-2.5-flash-lite"
+
+SYSTEM_INSTRUCTION = (
+    "You are an expert psychometric evaluator. Your ONLY task is to generate "
+    "personalized IQ feedback based on the user's test results. "
+    "NEVER introduce yourself. NEVER ask what the user wants. "
+    "NEVER provide general psychology help. Do not explain cognition topics. "
+    "Respond ONLY with structured feedback: strengths, weaknesses, interpretation, "
+    "and improvement plan. Keep length between 180 and 250 words."
+)
+
+
+class AIUnavailable(Exception):
+    """Gemini could not produce a response in time (or the circuit is open)."""
+
+
+# -----------------------------
+# CIRCUIT BREAKER
+# -----------------------------
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed calls and rejects calls until
+    `reset_after` seconds have passed; then one trial call is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold, reset_after):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_after:
+                # Half-open: let this caller probe, keep everyone else out
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+breaker = CircuitBreaker(
+    threshold=settings.GEMINI_BREAKER_THRESHOLD,
+    reset_after=settings.GEMINI_BREAKER_RESET,
+)
+
+
+# -----------------------------
+# MODEL (one per process)
+# -----------------------------
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """Configure the SDK and build the GenerativeModel on first use only."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _model = genai.GenerativeModel(GEMINI_MODEL, system_instruction=SYSTEM_INSTRUCTION)
+    return _model
+
+
+# -----------------------------
+# GENERATE
+# -----------------------------
+def generate_text(prompt):
+    """
+    Return Gemini's text for `prompt`.
+
+    The whole call, retries included, must finish within GEMINI_DEADLINE
+    seconds. Failures are retried up to GEMINI_MAX_RETRIES times with
+    full-jitter exponential backoff. Raises AIUnavailable when every try
+    fails, the deadline passes, or the circuit breaker is open.
+    """
+    if not breaker.allow():
+        raise AIUnavailable("Gemini circuit breaker is open")
+
+    deadline = time.monotonic() + settings.GEMINI_DEADLINE
+    last_error = None
+
+    for attempt in range(settings.GEMINI_MAX_RETRIES + 1):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+
+        try:
+            response = get_model().generate_content(prompt, request_options={"timeout": remaining})
+            text = response.candidates[0].content.parts[0].text.strip()
+        except Exception as e:
+            last_error = e
+        else:
+            breaker.record_success()
+            return text
+
+        if attempt < settings.GEMINI_MAX_RETRIES:
+            backoff = random.uniform(0, settings.GEMINI_BACKOFF_BASE * 2 ** attempt)
+            time.sleep(max(0, min(backoff, deadline - time.monotonic())))
+
+    breaker.record_failure()
+    raise AIUnavailable(f"Gemini request failed: {last_error!r}")
@@ -0,0 +1,48 @@
+# quizzes/attempts.py
+
+from django.utils import timezone
+
+from .models import UserAnswer
+
+# Batches sent just before the timer hits zero are still accepted
+ANSWER_GRACE_SECONDS = 30
+
+
+def remaining_seconds(attempt):
+    """Seconds left on the attempt's clock (negative once time is up)."""
+    elapsed = (timezone.now() - attempt.start_time).total_seconds()
+    return attempt.test.duration * 60 - elapsed
+
+
+def clean_selections(blueprint, selections):
+    """
+    Keep only {question_id: answer_id} pairs that belong to the blueprint's
+    test, so a crafted request cannot pick another question's answer.
+    A None answer (question skipped) is kept as-is.
+    """
+    valid = {q["id"]: {a["id"] for a in q["answers"]} for q in blueprint["questions"]}
+
+    return {
+        question_id: answer_id
+        for question_id, answer_id in selections.items()
+        if question_id in valid and (answer_id is None or answer_id in valid[question_id])
+    }
+
+
+def save_answers(attempt, selections):
+    """
+    Upsert {question_id: answer_id} selections for an attempt in a single
+    INSERT ... ON CONFLICT (attempt, question) DO UPDATE statement.
+    """
+    if not selections:
+        return
+
+    UserAnswer.objects.bulk_create(
+        [
+            UserAnswer(attempt=attempt, question_id=question_id, selected_answer_id=answer_id)
+            for question_id, answer_id in selections.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["attempt", "question"],
+        update_fields=["selected_answer"],
+    )
@@ -0,0 +1,56 @@
+# quizzes/blueprint.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from .models import Answer, Question
+
+
+# -----------------------------
+# TEST BLUEPRINT
+# -----------------------------
+# Everything needed to render a test's questions, in question order, built
+# with two queries and cached under the test's answer_key_version. Every
+# content change bumps that version (see quizzes/signals.py), so each worker
+# moves to the new blueprint together with the answer key it is graded by,
+# even with per-process caches; old versions simply expire. Correct answers
+# are deliberately left out so the blueprint is safe to ship to the browser.
+
+def blueprint_cache_key(test_id, version):
+    return f"test_blueprint:{test_id}:{version}"
+
+
+def build_blueprint(test_id):
+    questions = (
+        Question.objects
+        .filter(test_id=test_id)
+        .order_by("id")
+        .prefetch_related(Prefetch("answer_set", queryset=Answer.objects.order_by("id")))
+    )
+
+    return {
+        "test_id": test_id,
+        "questions": [
+            {
+                "id": q.id,
+                "text": q.text,
+                "image_url": q.image.url if q.image else "",
+                "question_type": q.question_type,
+                "category": q.category,
+                "difficulty": q.difficulty,
+                "answers": [{"id": a.id, "text": a.text} for a in q.answer_set.all()],
+            }
+            for q in questions
+        ],
+    }
+
+
+def get_blueprint(test):
+    """Blueprint of `test` at its current answer_key_version."""
+    key = blueprint_cache_key(test.pk, test.answer_key_version)
+    blueprint = cache.get(key)
+    if blueprint is None:
+        blueprint = build_blueprint(test.pk)
+        cache.set(key, blueprint, settings.BLUEPRINT_CACHE_TIMEOUT)
+    return blueprint
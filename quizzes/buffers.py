@@ -0,0 +1,165 @@
+# quizzes/buffers.py
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, IntegrityError, transaction
+
+# Alias in CACHES of the shared cache the buffers live in, if one is set up
+BUFFER_CACHE = "write_buffers"
+
+# How long a flush may hold the lock before another process can take over
+FLUSH_LOCK_TIMEOUT = 60  # seconds
+
+
+# -----------------------------
+# CACHE-BACKED WRITE BUFFER
+# -----------------------------
+# High-frequency, low-value rows (practice answers, game scores) are parked
+# in the cache and written with one bulk_create per flush instead of one
+# INSERT per request. Each row gets a sequence number from cache.incr and
+# sits under its own key; a flush reads everything between the last flushed
+# number and the newest one. A flush happens once `max_items` rows are
+# pending or the oldest pending row is `max_age` seconds old, checked on
+# every add, and from cron via manage.py flush_write_buffers.
+#
+# The buffer only works in a cache every worker shares and that never drops
+# keys (a Redis with maxmemory-policy noeviction, see WRITE_BUFFER_REDIS_URL):
+# an evicted row is lost and an evicted counter reorders the sequence. Without
+# the "write_buffers" cache each row is inserted as it is added.
+
+def buffer_cache():
+    """The shared buffer cache, or None to write straight to the database."""
+    if BUFFER_CACHE in settings.CACHES:
+        return caches[BUFFER_CACHE]
+    return None
+
+
+class WriteBuffer:
+    def __init__(self, name, model, max_items=None, max_age=None, on_flush=None):
+        self.name = name
+        self.model = model
+        self.max_items = max_items or settings.WRITE_BUFFER_MAX_ITEMS
+        self.max_age = max_age or settings.WRITE_BUFFER_MAX_AGE
+        self.on_flush = on_flush  # called with the created objects
+
+    def key(self, part):
+        return f"write_buffer:{self.name}:{part}"
+
+    def item_key(self, seq):
+        return self.key(f"item:{seq}")
+
+    def add(self, **fields):
+        """Buffer one row (model field values); flushes if a threshold is reached."""
+        cache = buffer_cache()
+        if cache is None:
+            self.written(self.insert([self.model(**fields)]))
+            return
+
+        cache.add(self.key("seq"), 0, None)
+        seq = cache.incr(self.key("seq"))
+        cache.set(self.item_key(seq), fields, None)
+        cache.add(self.key("oldest"), time.time(), None)
+
+        if self.should_flush(seq):
+            try:
+                self.flush()
+            except DatabaseError:
+                # Rows stay buffered; the next add or cron flush retries them
+                pass
+
+    def should_flush(self, seq=None):
+        cache = buffer_cache()
+        if cache is None:
+            return False
+        if seq is None:
+            seq = cache.get(self.key("seq"), 0)
+        if seq - cache.get(self.key("flushed"), 0) >= self.max_items:
+            return True
+        oldest = cache.get(self.key("oldest"))
+        return oldest is not None and time.time() - oldest >= self.max_age
+
+    def pending(self):
+        cache = buffer_cache()
+        if cache is None:
+            return 0
+        return cache.get(self.key("seq"), 0) - cache.get(self.key("flushed"), 0)
+
+    def flush(self):
+        """Write every buffered row with bulk_create. Returns the number written."""
+        cache = buffer_cache()
+        if cache is None:
+            return 0  # nothing is buffered
+
+        lock = self.key("lock")
+        if not cache.add(lock, 1, FLUSH_LOCK_TIMEOUT):
+            return 0  # another process is flushing
+
+        try:
+            start = cache.get(self.key("flushed"), 0)
+            end = cache.get(self.key("seq"), 0)
+            if end < start:
+                start = 0  # the cache was wiped and the counter restarted
+            keys = [self.item_key(seq) for seq in range(start + 1, end + 1)]
+            found = cache.get_many(keys)
+
+            # A missing row is either being written right now (its number is
+            # taken but the set has not landed) or was lost. Stop before it
+            # the first time; if it is still missing on the next flush, skip it.
+            rows = []
+            last = start
+            for seq, key in enumerate(keys, start + 1):
+                if key not in found:
+                    if cache.get(self.key("gap")) != seq:
+                        cache.set(self.key("gap"), seq, None)
+                        break
+                else:
+                    rows.append(self.model(**found[key]))
+                last = seq
+
+            objs = self.insert(rows)
+
+            cache.set(self.key("flushed"), last, None)
+            cache.delete_many(keys[:last - start])
+            cache.delete(self.key("oldest"))
+            if cache.get(self.key("seq"), 0) > last:
+                cache.add(self.key("oldest"), time.time(), None)
+        finally:
+            cache.delete(lock)
+
+        return self.written(objs)
+
+    def written(self, objs):
+        if self.on_flush and objs:
+            self.on_flush(objs)
+        return len(objs)
+
+    def insert(self, rows):
+        try:
+            with transaction.atomic():
+                return self.model.objects.bulk_create(rows, batch_size=500)
+        except IntegrityError:
+            pass
+
+        # Some row refers to something deleted since it was buffered (a user,
+        # say). Insert one by one and drop the rows that cannot be written,
+        # rather than retrying the whole batch forever.
+        objs = []
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    row.save(force_insert=True)
+            except IntegrityError:
+                continue
+            objs.append(row)
+        return objs
+
+
+# Every buffer, for manage.py flush_write_buffers
+BUFFERS = {}
+
+
+def register(buffer):
+    BUFFERS[buffer.name] = buffer
+    return buffer
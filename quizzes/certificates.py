@@ -0,0 +1,333 @@
+# quizzes/certificates.py
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from io import BytesIO
+from itertools import groupby
+
+import qrcode
+from PIL import Image
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.crypto import salted_hmac
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from .models import TestResult, UserTestAttempt
+from .scoring import score_attempt
+
+# Bump whenever the certificate layout changes so cached PDFs are regenerated
+CERTIFICATE_DESIGN_VERSION = 4
+
+# Check code in verification URLs, so certificates can't be enumerated by ID
+VERIFY_TOKEN_SALT = "quizzes.certificates.verify"
+VERIFY_TOKEN_LENGTH = 12
+
+
+# -----------------------------
+# VERIFICATION
+# -----------------------------
+def verification_token(attempt_id):
+    return salted_hmac(VERIFY_TOKEN_SALT, str(attempt_id)).hexdigest()[:VERIFY_TOKEN_LENGTH]
+
+
+def verification_url(attempt_id):
+    """Absolute URL of the public verify page, as encoded in the QR code."""
+    path = reverse("verify_certificate", args=[attempt_id, verification_token(attempt_id)])
+    return settings.SITE_URL.rstrip("/") + path
+
+
+def verification_cache_key(attempt_id):
+    return f"certificate_verification:{attempt_id}"
+
+
+def get_verification(attempt_id):
+    """Public facts shown on the verify page, or None if no such completed attempt."""
+    key = verification_cache_key(attempt_id)
+    record = cache.get(key)
+    if record is None:
+        attempt = (
+            UserTestAttempt.objects
+            .filter(pk=attempt_id, is_completed=True, end_time__isnull=False)
+            .select_related("user", "test")
+            .only("iq_score", "end_time", "user__username", "test__title")
+            .first()
+        )
+        if attempt is None:
+            return None
+
+        record = {
+            "attempt_id": attempt.id,
+            "username": attempt.user.username,
+            "test_title": attempt.test.title,
+            "iq_score": int(attempt.iq_score),
+            "date": str(attempt.end_time.date()),
+        }
+        cache.set(key, record, settings.CERTIFICATE_VERIFY_CACHE_TIMEOUT)
+    return record
+
+
+def invalidate_verification(attempt_id):
+    cache.delete(verification_cache_key(attempt_id))
+
+
+# -----------------------------
+# INPUTS + CONTENT HASH
+# -----------------------------
+def certificate_inputs(attempt):
+    """Everything drawn on an attempt's certificate, as plain JSON-ready values."""
+    try:
+        category_results = attempt.result.category_results
+    except TestResult.DoesNotExist:
+        category_results = score_attempt(attempt)["category_results"]
+
+    return {
+        "design": CERTIFICATE_DESIGN_VERSION,
+        "username": attempt.user.username,
+        "test_title": attempt.test.title,
+        "iq_score": int(attempt.iq_score),
+        "category_results": [
+            {"name": c["name"], "correct": c["correct"], "total": c["total"], "iq": c["iq"]}
+            for c in category_results
+        ],
+        "date": str(attempt.end_time.date()),
+        "verify_url": verification_url(attempt.id),
+    }
+
+
+def certificate_digest(inputs):
+    payload = json.dumps(inputs, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+# -----------------------------
+# RENDER
+# -----------------------------
+# Everything is drawn on one canvas per certificate. The watermark is the
+# only expensive part, so it is decoded, downsampled and encoded once per
+# process and embedded as-is: a JPEG stream goes into the PDF unchanged,
+# where a PIL image would be Flate-compressed again on every draw.
+
+WIDTH, HEIGHT = A4
+
+# Colors
+PRIMARY = colors.HexColor("#3B82F6")      # Blue
+DARK = colors.HexColor("#0F172A")         # Dark blue-black
+GRAY_LIGHT = colors.HexColor("#94A3B8")   # Soft gray
+
+WATERMARK_PATH = os.path.join(settings.BASE_DIR, "static", "img", "brain.png")
+WATERMARK_SIZE = 450  # points, drawn square
+WATERMARK_DPI = 150   # enough for screens and office printers
+WATERMARK_QUALITY = 85
+QR_SIZE = 80          # points, drawn square
+
+# Text uses Helvetica, one of the PDF base-14 fonts that every viewer ships,
+# so no font program is embedded at all. A TTF registered with
+# pdfmetrics is subset to the glyphs used automatically.
+# pageCompression Flate-compresses every content stream.
+CANVAS_OPTIONS = {"pagesize": A4, "pageCompression": 1}
+
+# Image streams are written binary. ASCII85 makes them a quarter bigger and
+# ReportLab encodes it in pure Python, which cost more than drawing the page.
+rl_config.useA85 = 0
+
+
+@lru_cache(maxsize=1)
+def watermark_jpeg():
+    """
+    JPEG bytes of the watermark at its drawn size and WATERMARK_DPI, or None
+    when the image is missing. It is the first thing drawn on a white page,
+    so transparency is flattened onto white.
+    """
+    if not os.path.exists(WATERMARK_PATH):
+        return None
+
+    pixels = round(WATERMARK_SIZE / 72 * WATERMARK_DPI)
+    image = Image.open(WATERMARK_PATH).convert("RGBA")
+    # Flat-colour artwork: smoothing filters invent colours and compress worse
+    image.thumbnail((pixels, pixels), Image.NEAREST)
+
+    flat = Image.new("RGB", image.size, "white")
+    flat.paste(image, mask=image.getchannel("A"))
+    buffer = BytesIO()
+    flat.save(buffer, format="JPEG", quality=WATERMARK_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def qr_modules(url):
+    """
+    Dark-module runs of the QR code for `url` as (x, y, width, height)
+    rectangles in points, scaled to QR_SIZE. They are drawn as a single
+    vector path, so no image is encoded or decoded per certificate.
+    """
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=4)
+    qr.add_data(url)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()  # includes the quiet-zone border
+
+    module = QR_SIZE / len(matrix)
+    rects = []
+    for row, cells in enumerate(matrix):
+        y = QR_SIZE - (row + 1) * module
+        col = 0
+        for dark, run in groupby(cells):
+            count = len(list(run))
+            if dark:
+                rects.append((col * module, y, count * module, module))
+            col += count
+
+    return tuple(rects)
+
+
+def render_certificate(inputs):
+    """Draw the certificate described by `inputs` and return the PDF bytes."""
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, **CANVAS_OPTIONS)
+    width, height = WIDTH, HEIGHT
+
+    # ----------------------- BACKGROUND -----------------------
+    # Light geometric brain watermark
+    watermark = watermark_jpeg()
+    if watermark is not None:
+        # A reader per canvas: ReportLab reads and rewinds its file
+        pdf.drawImage(
+            ImageReader(BytesIO(watermark)),
+            80, 200,
+            width=WATERMARK_SIZE, height=WATERMARK_SIZE,
+            preserveAspectRatio=True,
+            anchor='c'
+        )
+
+    # ----------------------- HEADER -----------------------
+    pdf.setFillColor(PRIMARY)
+    pdf.rect(0, height - 80, width, 80, fill=1)
+
+    pdf.setFillColor(colors.white)
+    pdf.setFont("Helvetica-Bold", 28)
+    pdf.drawCentredString(width / 2, height - 45, "OFFICIAL IQ CERTIFICATE")
+
+    # ----------------------- NAME -----------------------
+    pdf.setFillColor(DARK)
+    pdf.setFont("Helvetica-Bold", 24)
+    pdf.drawCentredString(width / 2, height - 140, inputs["username"])
+
+    pdf.setFont("Helvetica", 14)
+    pdf.drawCentredString(width / 2, height - 165, "has successfully completed")
+
+    # ----------------------- TEST TITLE -----------------------
+    pdf.setFont("Helvetica-Bold", 18)
+    pdf.drawCentredString(width / 2, height - 195, inputs["test_title"])
+
+    # ----------------------- IQ SCORE BADGE -----------------------
+    pdf.setFillColor(PRIMARY)
+    pdf.circle(width / 2, height - 290, 55, fill=1)
+
+    pdf.setFillColor(colors.white)
+    pdf.setFont("Helvetica-Bold", 36)
+    pdf.drawCentredString(width / 2, height - 300, str(inputs["iq_score"]))
+
+    pdf.setFont("Helvetica", 12)
+    pdf.drawCentredString(width / 2, height - 325, "IQ SCORE")
+
+    # ----------------------- CATEGORY TABLE -----------------------
+    y = height - 420
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.setFillColor(DARK)
+    pdf.drawString(70, y, "Category Performance")
+    y -= 30
+
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.setFillColor(PRIMARY)
+    pdf.drawString(70, y, "Category")
+    pdf.drawString(230, y, "Correct")
+    pdf.drawString(330, y, "Total")
+    pdf.drawString(430, y, "IQ")
+    y -= 20
+
+    pdf.setFillColor(DARK)
+    pdf.setFont("Helvetica", 12)
+
+    for cat in inputs["category_results"]:
+        pdf.drawString(70, y, cat["name"])
+        pdf.drawString(230, y, str(cat["correct"]))
+        pdf.drawString(330, y, str(cat["total"]))
+        pdf.drawString(430, y, str(cat["iq"]))
+        y -= 22
+
+    # ----------------------- DATE -----------------------
+    pdf.setFont("Helvetica", 12)
+    pdf.setFillColor(GRAY_LIGHT)
+    pdf.drawString(70, 120, f"Date: {inputs['date']}")
+
+    # ----------------------- SIGNATURE -----------------------
+    pdf.setFillColor(DARK)
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(70, 90, "Certified by TestIQ Platform")
+
+    pdf.line(70, 85, 250, 85)
+
+    # ----------------------- QR CODE -----------------------
+    qr_x, qr_y = width - 150, 60
+    path = pdf.beginPath()
+    for x, y, w, h in qr_modules(inputs["verify_url"]):
+        path.rect(qr_x + x, qr_y + y, w, h)
+
+    pdf.setFillColor(colors.black)
+    pdf.drawPath(path, stroke=0, fill=1)
+
+    # ----------------------- FINALIZE -----------------------
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+# -----------------------------
+# STORED CERTIFICATES
+# -----------------------------
+def certificate_dir(attempt_id):
+    return f"certificates/{attempt_id}"
+
+
+def certificate_path(attempt_id, digest):
+    return f"{certificate_dir(attempt_id)}/{digest}.pdf"
+
+
+def store_certificate(attempt_id, digest, pdf_bytes):
+    """Save a rendered PDF and delete the attempt's PDFs for older inputs."""
+    path = certificate_path(attempt_id, digest)
+
+    saved = default_storage.save(path, ContentFile(pdf_bytes))
+    if saved != path:
+        # A concurrent request stored the same PDF first; keep theirs
+        default_storage.delete(saved)
+
+    _, files = default_storage.listdir(certificate_dir(attempt_id))
+    for name in files:
+        if name != f"{digest}.pdf":
+            default_storage.delete(f"{certificate_dir(attempt_id)}/{name}")
+
+    return path
+
+
+def get_certificate(attempt):
+    """
+    Return (storage path, digest) of the attempt's certificate, rendering
+    it only when no PDF exists for the current inputs. PDFs rendered from
+    older inputs are deleted.
+    """
+    inputs = certificate_inputs(attempt)
+    digest = certificate_digest(inputs)
+    path = certificate_path(attempt.id, digest)
+
+    if not default_storage.exists(path):
+        store_certificate(attempt.id, digest, render_certificate(inputs))
+
+    return path, digest
@@ -0,0 +1,121 @@
+# quizzes/dashboard.py
+
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import UserTestAttempt
+from .scoring import CATEGORY_NAMES
+from .stats import get_user_stats
+
+# Attempts per page of the history table
+DASHBOARD_PAGE_SIZE = 10
+
+# Most recent attempts plotted on the IQ trend chart
+TREND_POINTS = 20
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+# -----------------------------
+# AGGREGATED STATS (cached per user)
+# -----------------------------
+def dashboard_stats_cache_key(user_id):
+    return f"dashboard_stats:{user_id}"
+
+
+def build_dashboard_stats(user_id):
+    """Headline numbers and category accuracy from the UserStats rollup, plus the IQ trend."""
+    stats = get_user_stats(user_id)
+
+    # Bounded by TREND_POINTS via the (user, -end_time) index
+    recent = list(
+        UserTestAttempt.objects
+        .filter(user_id=user_id, is_completed=True, end_time__isnull=False)
+        .order_by("-end_time", "-id")
+        .values_list("end_time", "iq_score")[:TREND_POINTS]
+    )
+    recent.reverse()
+
+    category_scores = {}
+    for name in CATEGORY_NAMES.values():
+        totals = stats.category_totals.get(name)
+        if totals and totals["total"]:
+            category_scores[name] = round(totals["correct"] / totals["total"] * 100)
+
+    return {
+        "tests_completed": stats.attempt_count,
+        "best_iq": stats.best_iq,
+        "average_iq": round(stats.iq_mean),
+        "iq_stddev": round(math.sqrt(stats.iq_variance)),
+        "average_score": round(stats.average_score, 1),
+        "latest_iq": stats.last_iq,
+        "iq_scores": [int(iq) for _, iq in recent],
+        "iq_labels": [end_time.strftime("%b %d") for end_time, _ in recent],
+        "category_scores": category_scores,
+    }
+
+
+def get_dashboard_stats(user_id):
+    key = dashboard_stats_cache_key(user_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = build_dashboard_stats(user_id)
+        cache.set(key, stats, settings.DASHBOARD_CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats(user_id):
+    cache.delete(dashboard_stats_cache_key(user_id))
+
+
+# -----------------------------
+# ATTEMPT HISTORY (keyset pagination)
+# -----------------------------
+# Pages are addressed by the (end_time, id) of the last row shown rather than
+# an OFFSET, so every page is one index range scan on (user, -end_time) no
+# matter how deep the user pages.
+
+def encode_cursor(attempt):
+    micros = (attempt.end_time - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}-{attempt.id}"
+
+
+def decode_cursor(cursor):
+    """(end_time, attempt_id) from a cursor string, or None if it is malformed."""
+    try:
+        micros, attempt_id = cursor.split("-")
+        return EPOCH + timedelta(microseconds=int(micros)), int(attempt_id)
+    except (AttributeError, ValueError, OverflowError):
+        return None
+
+
+def attempt_history(user_id):
+    """Completed attempts newest first, as the history table shows them."""
+    return (
+        UserTestAttempt.objects
+        .filter(user_id=user_id, is_completed=True, end_time__isnull=False)
+        .select_related("test")
+        .only("score", "iq_score", "end_time", "test__title")
+        .order_by("-end_time", "-id")
+    )
+
+
+def attempt_page(user_id, cursor=None, page_size=DASHBOARD_PAGE_SIZE):
+    """
+    Completed attempts newest first, starting after `cursor`.
+    Returns (attempts, next_cursor); next_cursor is None on the last page.
+    """
+    attempts = attempt_history(user_id)
+
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None:
+        end_time, attempt_id = position
+        attempts = attempts.filter(Q(end_time__lt=end_time) | Q(end_time=end_time, id__lt=attempt_id))
+
+    rows = list(attempts[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
@@ -0,0 +1,315 @@
+# quizzes/feedback.py
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .ai_client import AIUnavailable, generate_text
+from .models import FeedbackCacheEntry, FeedbackTask
+
+# A task is retried this many times before it is marked failed
+MAX_TASK_ATTEMPTS = 3
+
+# Running tasks older than this are assumed orphaned by a dead worker
+STALE_TASK_AFTER = timedelta(minutes=5)
+
+# While Gemini is unavailable a task keeps the template report as a
+# placeholder and is retried with exponential backoff, until it is this old
+UNAVAILABLE_RETRY_BASE = timedelta(minutes=1)
+UNAVAILABLE_RETRY_MAX = timedelta(hours=1)
+UNAVAILABLE_GIVE_UP_AFTER = timedelta(days=7)
+
+# Bump whenever the prompt or model changes so stale cached reports are not reused
+FEEDBACK_PROMPT_VERSION = 1
+
+
+# -----------------------------
+# GEMINI FEEDBACK
+# -----------------------------
+def build_feedback_prompt(iq_score, category_results, correct_count, total_questions):
+    categories_text = "\n".join(
+        [f"{c['name']}: {c['correct']}/{c['total']} (IQ {c['iq']})"
+         for c in category_results]
+    )
+
+    return f"""
+    Generate personalized IQ test feedback.
+
+    User results:
+    - IQ Score: {iq_score}
+    - Correct Answers: {correct_count}/{total_questions}
+    - Category Breakdown:
+      {categories_text}
+
+    Structure your feedback EXACTLY in this format:
+
+    1. **Strengths** — based on performance.
+    2. **Areas to Improve** — based strictly on weaker categories.
+    3. **IQ Interpretation** — short explanation of what their IQ means.
+    4. **Personalized Improvement Plan** — 3–5 bullet points.
+    """
+
+
+def generate_ai_feedback(iq_score, category_results, correct_count, total_questions):
+    """Gemini report for these results. Raises AIUnavailable when the API is failing."""
+    prompt = build_feedback_prompt(iq_score, category_results, correct_count, total_questions)
+    return generate_text(prompt)
+
+
+# -----------------------------
+# LOCAL FALLBACK REPORT
+# -----------------------------
+IQ_BANDS = [
+    (130, "very superior range, shared by roughly the top 2% of test takers"),
+    (115, "above-average range, ahead of most test takers"),
+    (85, "average range, where about two thirds of people score"),
+    (70, "below-average range; targeted practice usually lifts this quickly"),
+    (0, "lower range on this test; regular practice will help build a baseline"),
+]
+
+PRACTICE_TIPS = {
+    "Numerical": "Do 10 minutes of mental arithmetic and number-series drills daily.",
+    "Verbal": "Practise analogies and read a demanding article each day, noting new words.",
+    "Logical": "Work through syllogism and deduction puzzles, checking each step.",
+    "Spatial": "Rotate shapes mentally and try tangram or cube-net puzzles.",
+    "Memory": "Play the memory match game and try recalling short lists after a delay.",
+}
+
+
+def template_feedback(iq_score, category_results, correct_count, total_questions):
+    """Same four-section report as Gemini's, built locally when the API is unavailable."""
+    ranked = sorted(category_results, key=lambda c: c["iq"], reverse=True)
+    strong = [c for c in ranked if c["iq"] >= 110] or ranked[:1]
+    weak = [c for c in reversed(ranked) if c["iq"] < 110 and c not in strong][:2]
+
+    band = next(text for floor, text in IQ_BANDS if iq_score >= floor)
+
+    lines = ["1. **Strengths**"]
+    if strong:
+        lines += [f"- {c['name']}: {c['correct']}/{c['total']} correct (IQ {c['iq']})." for c in strong]
+    else:
+        lines.append(f"- You answered {correct_count} of {total_questions} questions correctly.")
+
+    lines += ["", "2. **Areas to Improve**"]
+    if weak:
+        lines += [f"- {c['name']}: {c['correct']}/{c['total']} correct (IQ {c['iq']})." for c in weak]
+    else:
+        lines.append("- No clear weak area; performance was even across categories.")
+
+    lines += [
+        "",
+        "3. **IQ Interpretation**",
+        f"An estimated IQ of {iq_score} places you in the {band}.",
+        "",
+        "4. **Personalized Improvement Plan**",
+    ]
+    for c in weak or strong:
+        lines.append(f"- {PRACTICE_TIPS.get(c['name'], 'Practise this category regularly.')}")
+    lines += [
+        "- Take a timed practice test weekly to track progress.",
+        "- Review every wrong answer and note the pattern you missed.",
+    ]
+
+    return "\n".join(lines)
+
+
+# -----------------------------
+# FEEDBACK CACHE
+# -----------------------------
+def feedback_cache_key(iq_score, category_results, correct_count, total_questions):
+    """sha256 of the normalized prompt inputs; equal score profiles share a key."""
+    profile = {
+        "v": FEEDBACK_PROMPT_VERSION,
+        "iq": int(iq_score),
+        "correct": int(correct_count),
+        "total": int(total_questions),
+        "categories": sorted(
+            [c["name"], int(c["correct"]), int(c["total"]), int(c["iq"])]
+            for c in category_results
+        ),
+    }
+    payload = json.dumps(profile, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cached_feedback(key):
+    """
+    Look the report up in the Django cache, then the persistent table.
+
+    Only table hits refresh last_used_at, so LRU order is approximate while
+    an entry is hot in the Django cache; that is all eviction needs.
+    """
+    text = cache.get(f"ai_feedback:{key}")
+    if text is not None:
+        return text
+
+    fresh_after = timezone.now() - timedelta(seconds=settings.FEEDBACK_CACHE_TTL)
+    entry = FeedbackCacheEntry.objects.filter(pk=key, created_at__gte=fresh_after).first()
+    if entry is None:
+        return None
+
+    FeedbackCacheEntry.objects.filter(pk=key).update(
+        hits=F("hits") + 1,
+        last_used_at=timezone.now(),
+    )
+    cache.set(f"ai_feedback:{key}", entry.feedback, settings.FEEDBACK_CACHE_TTL)
+    return entry.feedback
+
+
+def store_cached_feedback(key, text):
+    """Persist a report, then evict expired and least-recently-used entries."""
+    now = timezone.now()
+    FeedbackCacheEntry.objects.update_or_create(
+        pk=key,
+        defaults={"feedback": text, "created_at": now, "last_used_at": now},
+    )
+    cache.set(f"ai_feedback:{key}", text, settings.FEEDBACK_CACHE_TTL)
+
+    expired_before = now - timedelta(seconds=settings.FEEDBACK_CACHE_TTL)
+    FeedbackCacheEntry.objects.filter(created_at__lt=expired_before).delete()
+
+    excess = FeedbackCacheEntry.objects.count() - settings.FEEDBACK_CACHE_MAX_ENTRIES
+    if excess > 0:
+        lru_keys = list(
+            FeedbackCacheEntry.objects.order_by("last_used_at").values_list("pk", flat=True)[:excess]
+        )
+        FeedbackCacheEntry.objects.filter(pk__in=lru_keys).delete()
+
+
+def cached_ai_feedback(iq_score, category_results, correct_count, total_questions):
+    """
+    Feedback for these results: cached report if the score profile was seen
+    before, otherwise Gemini. Raises AIUnavailable when Gemini is down.
+    """
+    key = feedback_cache_key(iq_score, category_results, correct_count, total_questions)
+
+    text = get_cached_feedback(key)
+    if text is not None:
+        return text
+
+    text = generate_ai_feedback(iq_score, category_results, correct_count, total_questions)
+    store_cached_feedback(key, text)
+    return text
+
+
+# -----------------------------
+# BACKGROUND TASK QUEUE
+# -----------------------------
+def enqueue_feedback(result):
+    """Queue AI feedback generation for a freshly written TestResult."""
+    task, _ = FeedbackTask.objects.get_or_create(result=result)
+    return task
+
+
+def claim_next_task():
+    """
+    Atomically claim the oldest runnable task, or return None.
+
+    SKIP LOCKED lets several workers poll the same table without
+    blocking on (or double-processing) each other's rows.
+    """
+    now = timezone.now()
+    stale_before = now - STALE_TASK_AFTER
+
+    with transaction.atomic():
+        task = (
+            FeedbackTask.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=FeedbackTask.PENDING, not_before__isnull=True)
+                | Q(status=FeedbackTask.PENDING, not_before__lte=now)
+                | Q(status=FeedbackTask.RUNNING, locked_at__lt=stale_before)
+            )
+            .order_by("created_at")
+            .first()
+        )
+        if task is None:
+            return None
+
+        task.status = FeedbackTask.RUNNING
+        task.locked_at = timezone.now()
+        task.attempts += 1
+        task.save(update_fields=["status", "locked_at", "attempts", "updated_at"])
+
+    return task
+
+
+def unavailable_backoff(attempts):
+    # The exponent is capped: a week of hourly retries would overflow timedelta
+    doublings = min(max(0, attempts - 1), 20)
+    return min(UNAVAILABLE_RETRY_MAX, UNAVAILABLE_RETRY_BASE * 2 ** doublings)
+
+
+def run_task(task):
+    """
+    Generate feedback for a claimed task and store it on its TestResult.
+
+    While Gemini is unavailable the result shows the template report and the
+    task goes back to the queue with a backoff, so the real report replaces
+    it once Gemini recovers.
+    """
+    result = task.result
+
+    try:
+        text = cached_ai_feedback(
+            result.iq_score,
+            result.category_results,
+            result.correct_count,
+            result.total_questions
+        )
+    except AIUnavailable as e:
+        task.last_error = str(e)[:1000]
+        if task.created_at >= timezone.now() - UNAVAILABLE_GIVE_UP_AFTER:
+            task.status = FeedbackTask.PENDING
+            task.not_before = timezone.now() + unavailable_backoff(task.attempts)
+        else:
+            task.status = FeedbackTask.FAILED
+
+        with transaction.atomic():
+            if not result.ai_feedback:
+                result.ai_feedback = template_feedback(
+                    result.iq_score,
+                    result.category_results,
+                    result.correct_count,
+                    result.total_questions
+                )
+                result.save(update_fields=["ai_feedback"])
+            task.save(update_fields=["status", "not_before", "last_error", "updated_at"])
+        return task
+    except Exception as e:
+        task.last_error = str(e)[:1000]
+        if task.attempts < MAX_TASK_ATTEMPTS:
+            task.status = FeedbackTask.PENDING
+            task.save(update_fields=["status", "last_error", "updated_at"])
+            return task
+
+        text = template_feedback(
+            result.iq_score,
+            result.category_results,
+            result.correct_count,
+            result.total_questions
+        )
+        task.status = FeedbackTask.FAILED
+    else:
+        task.status = FeedbackTask.DONE
+
+    with transaction.atomic():
+        result.ai_feedback = text
+        result.save(update_fields=["ai_feedback"])
+        task.save(update_fields=["status", "last_error", "updated_at"])
+
+    return task
+
+
+def process_next_task():
+    """Claim and run one task. Returns the task, or None if the queue is empty."""
+    task = claim_next_task()
+    if task is not None:
+        run_task(task)
+    return task
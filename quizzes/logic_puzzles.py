@@ -0,0 +1,217 @@
+# quizzes/logic_puzzles.py
+
+import random
+import string
+from fractions import Fraction
+
+# "What comes next?" sequence puzzles. A puzzle is a list of shown terms
+# plus the answer; letter series are generated and solved as alphabet
+# positions (A = 1 .. Z = 26). Kinds match LogicPuzzle.KIND_CHOICES.
+
+LETTERS = string.ascii_uppercase
+
+# Largest number a generated puzzle may show or ask for
+MAX_TERM = 5000
+
+
+# -----------------------------
+# SOLVER
+# -----------------------------
+# Every rule family that fits the shown terms predicts a next term. A puzzle
+# is only kept if all fitting families agree, so "2, 3, 5, 8" (Fibonacci
+# says 13, constant second difference says 12) never reaches a player.
+
+def differences(terms):
+    return [b - a for a, b in zip(terms, terms[1:])]
+
+
+def next_arithmetic(terms):
+    steps = differences(terms)
+    if len(terms) >= 3 and len(set(steps)) == 1:
+        return terms[-1] + steps[0]
+    return None
+
+
+def next_geometric(terms):
+    if len(terms) < 3 or 0 in terms:
+        return None
+    ratios = {Fraction(b, a) for a, b in zip(terms, terms[1:])}
+    if len(ratios) != 1:
+        return None
+    nxt = terms[-1] * ratios.pop()
+    return int(nxt) if nxt.denominator == 1 else None
+
+
+def next_fibonacci(terms):
+    if len(terms) >= 4 and all(terms[i] == terms[i - 1] + terms[i - 2] for i in range(2, len(terms))):
+        return terms[-1] + terms[-2]
+    return None
+
+
+def next_second_order(terms):
+    # Constant second difference (1, 2, 4, 7, 11, ...); needs two of them to
+    # agree, otherwise any four numbers would fit
+    if len(terms) < 4:
+        return None
+    steps = differences(terms)
+    step = next_arithmetic(steps)
+    return None if step is None else terms[-1] + step
+
+
+def next_interleaved(terms):
+    # Two alternating sequences, each arithmetic or geometric
+    if len(terms) < 6:
+        return None
+    evens, odds = terms[0::2], terms[1::2]
+    if next_arithmetic(evens) is None and next_geometric(evens) is None:
+        return None
+    if next_arithmetic(odds) is None and next_geometric(odds) is None:
+        return None
+    following = evens if len(terms) % 2 == 0 else odds
+    nxt = next_arithmetic(following)
+    return nxt if nxt is not None else next_geometric(following)
+
+
+RULES = [next_arithmetic, next_geometric, next_fibonacci, next_second_order, next_interleaved]
+
+
+def predictions(terms):
+    """The distinct next terms predicted by every rule that fits."""
+    found = set()
+    for rule in RULES:
+        nxt = rule(terms)
+        if nxt is not None:
+            found.add(nxt)
+    return found
+
+
+def solve(terms):
+    """The next term if the shown terms determine exactly one, else None."""
+    found = predictions(terms)
+    return found.pop() if len(found) == 1 else None
+
+
+def verify(kind, terms, answer):
+    """True if the puzzle is unambiguous and its answer is the one the rules give."""
+    if kind == "letters":
+        if not all(1 <= t <= len(LETTERS) for t in terms + [answer]):
+            return False
+    elif any(abs(t) > MAX_TERM for t in terms + [answer]):
+        return False
+    return solve(terms) == answer
+
+
+# -----------------------------
+# GENERATORS
+# -----------------------------
+# Each returns the full sequence, shown terms followed by the answer.
+# Difficulty (codes as in models.DIFFICULTY_LEVELS) widens the numbers,
+# hides more of the sequence, or mixes rules.
+
+def nonzero(rng, low, high):
+    return rng.choice([n for n in range(low, high + 1) if n])
+
+
+def arithmetic(rng, difficulty):
+    if difficulty == "E":
+        start, step, length = rng.randint(1, 20), rng.randint(2, 9), 6
+    elif difficulty == "M":
+        start, step, length = rng.randint(-20, 60), nonzero(rng, -15, 25), 6
+    else:
+        start, step, length = rng.randint(-100, 200), nonzero(rng, -60, 90), 5
+    return [start + step * i for i in range(length)]
+
+
+def geometric(rng, difficulty):
+    if difficulty == "E":
+        start, ratio, length = rng.randint(1, 12), rng.choice([2, 3, 10]), 5
+    elif difficulty == "M":
+        start, ratio, length = rng.randint(1, 9), rng.choice([2, 3, 4, 5]), 5
+    else:
+        start, ratio, length = rng.randint(2, 12), rng.choice([-3, -2, 3, 4, 5, 6]), 5
+    return [start * ratio ** i for i in range(length)]
+
+
+def fibonacci(rng, difficulty):
+    if difficulty == "E":
+        terms, length = [rng.randint(1, 5), rng.randint(1, 5)], 7
+    elif difficulty == "M":
+        terms, length = [rng.randint(1, 20), rng.randint(1, 20)], 6
+    else:
+        terms, length = [rng.randint(-10, 30), rng.randint(-10, 30)], 6
+    while len(terms) < length:
+        terms.append(terms[-1] + terms[-2])
+    return terms
+
+
+def interleaved(rng, difficulty):
+    def progression(geometric_ok):
+        if geometric_ok and rng.random() < 0.5:
+            start, ratio = rng.randint(1, 6), rng.choice([2, 3])
+            return lambda i: start * ratio ** i
+        start = rng.randint(1, 30 if difficulty == "E" else 80)
+        step = rng.randint(1, 6) if difficulty == "E" else nonzero(rng, -12, 15)
+        return lambda i: start + step * i
+
+    first, second = progression(False), progression(difficulty == "H")
+    length = 9 if difficulty == "E" else 8
+    return [(first if i % 2 == 0 else second)(i // 2) for i in range(length)]
+
+
+def letters(rng, difficulty):
+    if difficulty == "E":
+        start, step, length = rng.randint(1, 8), rng.randint(1, 3), 6
+        positions = [start + step * i for i in range(length)]
+    elif difficulty == "M":
+        step, length = nonzero(rng, -5, 5), 6
+        start = rng.randint(1, 10) if step > 0 else rng.randint(17, 26)
+        positions = [start + step * i for i in range(length)]
+    else:
+        # Growing gaps: +1, +2, +3, ... from a random starting gap, either
+        # up from the start of the alphabet or down from the end
+        gap, length = rng.randint(1, 3), 6
+        positions = [rng.randint(1, 5)]
+        while len(positions) < length:
+            positions.append(positions[-1] + gap)
+            gap += 1
+        if rng.random() < 0.5:
+            positions = [len(LETTERS) + 1 - p for p in positions]
+    return positions
+
+
+GENERATORS = {
+    "arithmetic": arithmetic,
+    "geometric": geometric,
+    "fibonacci": fibonacci,
+    "interleaved": interleaved,
+    "letters": letters,
+}
+
+
+# -----------------------------
+# PUZZLES
+# -----------------------------
+def format_term(kind, term):
+    return LETTERS[term - 1] if kind == "letters" else str(term)
+
+
+def question_text(kind, shown):
+    return "What comes next? " + ", ".join(format_term(kind, t) for t in shown) + ", ?"
+
+
+def generate(difficulty="M", kind=None, rng=None, tries=50):
+    """
+    (kind, question, answer) for a new verified puzzle; a random kind unless
+    one is given. Sequences some rule other than their own would continue
+    differently are thrown away and drawn again.
+    """
+    rng = rng or random.Random()
+    kind = kind or rng.choice(list(GENERATORS))
+
+    for _ in range(tries):
+        sequence = GENERATORS[kind](rng, difficulty)
+        shown, answer = sequence[:-1], sequence[-1]
+        if verify(kind, shown, answer):
+            return kind, question_text(kind, shown), format_term(kind, answer)
+
+    raise ValueError(f"Could not generate an unambiguous {kind} puzzle")
@@ -0,0 +1,159 @@
+import os
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+import qrcode
+from django.core.management.base import BaseCommand
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from quizzes.certificates import WATERMARK_PATH, render_certificate, watermark_jpeg
+
+SAMPLE_INPUTS = {
+    "design": 0,
+    "username": "benchmark_user",
+    "test_title": "Standard IQ Test",
+    "iq_score": 118,
+    "category_results": [
+        {"name": "Numerical", "correct": 8, "total": 10, "iq": 140},
+        {"name": "Verbal", "correct": 4, "total": 6, "iq": 126},
+        {"name": "Logical", "correct": 3, "total": 5, "iq": 120},
+        {"name": "Spatial", "correct": 2, "total": 4, "iq": 110},
+    ],
+    "date": "2025-01-01",
+    "verify_url": "https://example.com/certificate/verify/1/",
+}
+
+
+def render_original(inputs):
+    """The certificate as download_certificate drew it before it was cached."""
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+
+    primary = colors.HexColor("#3B82F6")
+    dark = colors.HexColor("#0F172A")
+    gray_light = colors.HexColor("#94A3B8")
+
+    if os.path.exists(WATERMARK_PATH):
+        pdf.drawImage(
+            ImageReader(WATERMARK_PATH),
+            80, 200,
+            width=450, height=450,
+            mask='auto',
+            preserveAspectRatio=True,
+            anchor='c'
+        )
+
+    pdf.setFillColor(primary)
+    pdf.rect(0, height - 80, width, 80, fill=1)
+    pdf.setFillColor(colors.white)
+    pdf.setFont("Helvetica-Bold", 28)
+    pdf.drawCentredString(width / 2, height - 45, "OFFICIAL IQ CERTIFICATE")
+
+    pdf.setFillColor(dark)
+    pdf.setFont("Helvetica-Bold", 24)
+    pdf.drawCentredString(width / 2, height - 140, inputs["username"])
+    pdf.setFont("Helvetica", 14)
+    pdf.drawCentredString(width / 2, height - 165, "has successfully completed")
+    pdf.setFont("Helvetica-Bold", 18)
+    pdf.drawCentredString(width / 2, height - 195, inputs["test_title"])
+
+    pdf.setFillColor(primary)
+    pdf.circle(width / 2, height - 290, 55, fill=1)
+    pdf.setFillColor(colors.white)
+    pdf.setFont("Helvetica-Bold", 36)
+    pdf.drawCentredString(width / 2, height - 300, str(inputs["iq_score"]))
+    pdf.setFont("Helvetica", 12)
+    pdf.drawCentredString(width / 2, height - 325, "IQ SCORE")
+
+    y = height - 420
+    pdf.setFont("Helvetica-Bold", 16)
+    pdf.setFillColor(dark)
+    pdf.drawString(70, y, "Category Performance")
+    y -= 30
+    pdf.setFont("Helvetica-Bold", 12)
+    pdf.setFillColor(primary)
+    pdf.drawString(70, y, "Category")
+    pdf.drawString(230, y, "Correct")
+    pdf.drawString(330, y, "Total")
+    pdf.drawString(430, y, "IQ")
+    y -= 20
+    pdf.setFillColor(dark)
+    pdf.setFont("Helvetica", 12)
+    for cat in inputs["category_results"]:
+        pdf.drawString(70, y, cat["name"])
+        pdf.drawString(230, y, str(cat["correct"]))
+        pdf.drawString(330, y, str(cat["total"]))
+        pdf.drawString(430, y, str(cat["iq"]))
+        y -= 22
+
+    pdf.setFont("Helvetica", 12)
+    pdf.setFillColor(gray_light)
+    pdf.drawString(70, 120, f"Date: {inputs['date']}")
+
+    pdf.setFillColor(dark)
+    pdf.setFont("Helvetica-Bold", 14)
+    pdf.drawString(70, 90, "Certified by TestIQ Platform")
+    pdf.line(70, 85, 250, 85)
+
+    qr_buffer = BytesIO()
+    qrcode.make(inputs["verify_url"]).save(qr_buffer, format="PNG")
+    qr_buffer.seek(0)
+    pdf.drawImage(ImageReader(qr_buffer), width - 150, 60, width=80, height=80)
+
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+@contextmanager
+def ascii85(enabled):
+    """ReportLab's image encoding as it was configured before the change."""
+    previous = rl_config.useA85
+    rl_config.useA85 = enabled
+    try:
+        yield
+    finally:
+        rl_config.useA85 = previous
+
+
+class Command(BaseCommand):
+    help = (
+        "Time certificate rendering: the original renderer, which re-encoded the "
+        "full-size watermark and a PNG QR code per certificate, against the current one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=30, help="Certificates per run (default: 30).")
+
+    def handle(self, *args, **options):
+        n = options["iterations"]
+
+        if not os.path.exists(WATERMARK_PATH):
+            self.stdout.write(self.style.WARNING(
+                f"Watermark {WATERMARK_PATH} not found; timings exclude image encoding."
+            ))
+
+        with ascii85(1):
+            original_ms = self.time_per_call(lambda: render_original(SAMPLE_INPUTS), n)
+            original_size = len(render_original(SAMPLE_INPUTS))
+
+        watermark_jpeg()
+        current_ms = self.time_per_call(lambda: render_certificate(SAMPLE_INPUTS), n)
+        current_size = len(render_certificate(SAMPLE_INPUTS))
+
+        self.stdout.write(f"Original renderer: {original_ms:8.2f} ms/certificate, {original_size / 1024:6.1f} KiB")
+        self.stdout.write(f"Current renderer:  {current_ms:8.2f} ms/certificate, {current_size / 1024:6.1f} KiB")
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {original_ms / current_ms:.1f}x"))
+
+    def time_per_call(self, fn, n):
+        fn()  # warm imports and font caches
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return (time.perf_counter() - start) / n * 1000
@@ -0,0 +1,169 @@
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from quizzes.dashboard import DASHBOARD_PAGE_SIZE, attempt_history
+from quizzes.models import Answer, Question, Test, UserAnswer, UserTestAttempt
+
+# The composite indexes added for the hot queries (migration 0006)
+HOT_QUERY_INDEXES = [
+    (UserTestAttempt, "attempt_user_end_idx"),
+    (UserTestAttempt, "attempt_user_completed_idx"),
+    (Question, "question_test_id_idx"),
+    (Question, "question_test_category_idx"),
+    (Answer, "answer_question_correct_idx"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway dataset and print EXPLAIN plans for the dashboard, "
+        "blueprint, answer key and scoring queries with and without the composite indexes. "
+        "Everything runs in one transaction that is rolled back, but dropping the indexes "
+        "locks the attempt and answer tables until then, so point --database at a migrated "
+        "scratch copy; the default database is only allowed with DEBUG on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database", default=DEFAULT_DB_ALIAS,
+            help="Alias in DATABASES of a scratch database to run against (default: default).",
+        )
+        parser.add_argument("--tests", type=int, default=20, help="Tests to seed (default: 20).")
+        parser.add_argument("--users", type=int, default=200, help="Users to seed (default: 200).")
+        parser.add_argument(
+            "--attempts", type=int, default=25,
+            help="Completed attempts per user (default: 25).",
+        )
+
+    def handle(self, *args, **options):
+        self.using = options["database"]
+        if self.using not in settings.DATABASES:
+            raise CommandError(f"Unknown database alias {self.using!r}.")
+        if self.using == DEFAULT_DB_ALIAS and not settings.DEBUG:
+            raise CommandError(
+                "Refusing to drop indexes on the default database with DEBUG off: it would block "
+                "every test taker until the run ends. Pass --database with a scratch database alias."
+            )
+
+        with transaction.atomic(using=self.using):
+            user, test, attempt = self.seed(options["tests"], options["users"], options["attempts"])
+            queries = self.hot_queries(user, test, attempt)
+
+            self.analyze()
+            after = {label: qs.using(self.using).explain() for label, qs in queries}
+
+            self.drop_indexes()
+            self.analyze()
+            before = {label: qs.using(self.using).explain() for label, qs in queries}
+
+            transaction.set_rollback(True, using=self.using)
+
+        for label, _ in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label} =="))
+            self.stdout.write(self.style.WARNING("-- before (default FK indexes only)"))
+            self.stdout.write(before[label])
+            self.stdout.write(self.style.SUCCESS("-- after (composite indexes)"))
+            self.stdout.write(after[label])
+
+    # -----------------------------
+    # QUERIES UNDER TEST
+    # -----------------------------
+    def hot_queries(self, user, test, attempt):
+        return [
+            (
+                "Dashboard: first history page (quizzes.dashboard.attempt_history)",
+                attempt_history(user.pk)[:DASHBOARD_PAGE_SIZE + 1],
+            ),
+            (
+                "Blueprint: questions of a test in order",
+                Question.objects.filter(test=test).order_by("id"),
+            ),
+            (
+                "Answer key publish: correct answers of a test",
+                Answer.objects.filter(question__test=test, is_correct=True).values_list("question_id", "id"),
+            ),
+            (
+                "Scoring: selected answers of one attempt",
+                UserAnswer.objects.filter(attempt=attempt).values_list("question_id", "selected_answer_id"),
+            ),
+        ]
+
+    # -----------------------------
+    # SEEDING
+    # -----------------------------
+    def seed(self, n_tests, n_users, attempts_per_user):
+        rng = random.Random(42)
+        now = timezone.now()
+        categories = ["VR", "NR", "LR", "SR", "MR"]
+        difficulties = ["E", "M", "H"]
+
+        tests = Test.objects.using(self.using).bulk_create(
+            [Test(title=f"Benchmark test {i}", duration=20) for i in range(n_tests)]
+        )
+        questions = Question.objects.using(self.using).bulk_create([
+            Question(
+                test=t,
+                text=f"Benchmark question {t.pk}-{i}",
+                category=rng.choice(categories),
+                difficulty=rng.choice(difficulties),
+            )
+            for t in tests for i in range(25)
+        ])
+        answers = Answer.objects.using(self.using).bulk_create([
+            Answer(question=q, text=f"Option {i}", is_correct=(i == 0))
+            for q in questions for i in range(4)
+        ])
+
+        questions_by_test = {}
+        for q in questions:
+            questions_by_test.setdefault(q.test_id, []).append(q)
+        answers_by_question = {}
+        for a in answers:
+            answers_by_question.setdefault(a.question_id, []).append(a)
+
+        users = User.objects.using(self.using).bulk_create(
+            [User(username=f"benchmark_user_{i}") for i in range(n_users)]
+        )
+        attempts = UserTestAttempt.objects.using(self.using).bulk_create([
+            UserTestAttempt(
+                user=u,
+                test=rng.choice(tests),
+                end_time=now - timedelta(hours=rng.randint(1, 24 * 365)),
+                is_completed=rng.random() < 0.9,
+                iq_score=rng.randint(60, 160),
+            )
+            for u in users for _ in range(attempts_per_user)
+        ])
+
+        UserAnswer.objects.using(self.using).bulk_create(
+            [
+                UserAnswer(attempt=a, question=q, selected_answer=rng.choice(answers_by_question[q.pk]))
+                for a in attempts for q in questions_by_test[a.test_id]
+            ],
+            batch_size=5000,
+        )
+
+        self.stdout.write(
+            f"Seeded {len(tests)} tests, {len(questions)} questions, "
+            f"{len(users)} users and {len(attempts)} attempts."
+        )
+        return users[0], tests[0], attempts[0]
+
+    # -----------------------------
+    # HELPERS
+    # -----------------------------
+    def analyze(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def drop_indexes(self):
+        connection = connections[self.using]
+        with connection.cursor() as cursor:
+            for model, name in HOT_QUERY_INDEXES:
+                cursor.execute(f"DROP INDEX {connection.ops.quote_name(name)}")
@@ -0,0 +1,65 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizzes import sudoku
+
+# Well-known hard puzzles (Inkala's "world's hardest", Platinum Blonde,
+# Golden Nugget, Easter Monster and other search-heavy grids)
+HARD_PUZZLES = [
+    "800000000003600000070090200050007000000045700000100030001000068008500010090000400",
+    "000000012000000003002300400001800005060070800000009000008500000900040500470006000",
+    "000000039000001005003050800008090006070002000100400000009080050020000600400700000",
+    "100000002090400050006000700050903000000070000000850040700000600030009080002000001",
+    "000000010400000000020000000000050407008000300001090000300400200050100000000806000",
+    "400000805030000000000700000020000060000080400000010000000603070500200000104000000",
+    "100007090030020008009600500005300900010080002600004000300000010040000007007000300",
+    "000000000000003085001020000000507000004000100090000000500000073002010000000040009",
+    "120400300300010050006000100700090000040603000003002000500080700007000005000000098",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the Sudoku solver on generated puzzles of each difficulty and on a "
+        "corpus of known hard puzzles, both for a plain solve and a uniqueness check."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--puzzles", type=int, default=100, help="Generated puzzles per difficulty (default: 100).")
+        parser.add_argument("--repeat", type=int, default=5, help="Timed runs per puzzle (default: 5).")
+        parser.add_argument("--seed", type=int, default=7, help="Random seed for generated puzzles (default: 7).")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        corpora = [
+            (f"Generated {code}", [sudoku.generate(code, rng)[0] for _ in range(options["puzzles"])])
+            for code in sudoku.DIFFICULTY_CLUES
+        ]
+        corpora.append(("Hard corpus", HARD_PUZZLES))
+
+        self.stdout.write(f"{'':14}{'solve (ms)':>30}{'unique check (ms)':>32}")
+        self.stdout.write(f"{'':14}{'median':>10}{'mean':>10}{'max':>10}{'median':>12}{'mean':>10}{'max':>10}")
+
+        for label, puzzles in corpora:
+            grids = [sudoku.parse_grid(p) for p in puzzles]
+            solve = self.time_each(grids, 1, options["repeat"])
+            unique = self.time_each(grids, 2, options["repeat"])
+            self.stdout.write(
+                f"{label:14}"
+                f"{solve[0]:10.3f}{solve[1]:10.3f}{solve[2]:10.3f}"
+                f"{unique[0]:12.3f}{unique[1]:10.3f}{unique[2]:10.3f}"
+            )
+
+    def time_each(self, grids, limit, repeat):
+        """(median, mean, max) milliseconds of sudoku.solutions(grid, limit)."""
+        times = []
+        for cells in grids:
+            start = time.perf_counter()
+            for _ in range(repeat):
+                sudoku.solutions(cells, limit=limit)
+            times.append((time.perf_counter() - start) / repeat * 1000)
+        return statistics.median(times), statistics.mean(times), max(times)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from quizzes import practice  # noqa: F401  (registers its write buffers)
+from quizzes.buffers import BUFFERS
+
+
+class Command(BaseCommand):
+    help = (
+        "Write every row waiting in the Redis-backed write buffers (WRITE_BUFFER_REDIS_URL) "
+        "to the database. Run from cron (e.g. every minute) so buffered rows land even when "
+        "traffic is quiet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--buffer", action="append", choices=sorted(BUFFERS),
+            help="Only this buffer (repeatable; default: all).",
+        )
+
+    def handle(self, *args, **options):
+        for name in options["buffer"] or sorted(BUFFERS):
+            written = BUFFERS[name].flush()
+            self.stdout.write(f"{name}: wrote {written} rows")
+
+        self.stdout.write(self.style.SUCCESS("Write buffers flushed."))
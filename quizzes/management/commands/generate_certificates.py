@@ -0,0 +1,116 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import django
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from quizzes.certificates import (
+    certificate_digest,
+    certificate_inputs,
+    certificate_path,
+    render_certificate,
+    store_certificate,
+)
+from quizzes.models import UserTestAttempt
+
+# Attempts whose inputs are collected per database round trip
+CHUNK_SIZE = 500
+
+
+def init_worker():
+    # Spawned workers start without configured settings
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Render certificates for completed attempts that ended in a date range, "
+        "using a pool of worker processes. Attempts that already have a PDF for "
+        "their current inputs are skipped, so an interrupted run can simply be re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First end date, YYYY-MM-DD (inclusive).")
+        parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last end date, YYYY-MM-DD (inclusive).")
+        parser.add_argument("--test", type=int, help="Only attempts of this test ID.")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="Rendering processes (default: CPU count).",
+        )
+        parser.add_argument("--force", action="store_true", help="Re-render certificates that already exist.")
+        parser.add_argument("--progress-every", type=int, default=50, help="Report progress every N certificates (default: 50).")
+
+    def handle(self, *args, **options):
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1.")
+        if options["date_from"] and options["date_to"] and options["date_from"] > options["date_to"]:
+            raise CommandError("--from must not be after --to.")
+
+        jobs, skipped = self.collect_jobs(options)
+        total = len(jobs)
+        self.stdout.write(f"{total} certificates to render, {skipped} already up to date.")
+        if not total:
+            return
+
+        # Workers never touch the database; don't let forked children inherit its sockets
+        connections.close_all()
+
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=init_worker) as pool:
+            futures = {
+                pool.submit(render_certificate, inputs): (attempt_id, digest)
+                for attempt_id, digest, inputs in jobs
+            }
+
+            for future in as_completed(futures):
+                attempt_id, digest = futures[future]
+                try:
+                    pdf_bytes = future.result()
+                    if options["force"]:
+                        default_storage.delete(certificate_path(attempt_id, digest))
+                    store_certificate(attempt_id, digest, pdf_bytes)
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"Attempt {attempt_id}: {exc}")
+                else:
+                    done += 1
+
+                finished = done + failed
+                if finished % options["progress_every"] == 0 or finished == total:
+                    self.stdout.write(f"[{finished}/{total}] rendered {done}, failed {failed}")
+
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"Rendered {done} certificates, {failed} failed, {skipped} skipped."))
+
+    def collect_jobs(self, options):
+        """(attempt_id, digest, inputs) for every attempt that needs a PDF, plus the skip count."""
+        attempts = (
+            UserTestAttempt.objects
+            .filter(is_completed=True, end_time__isnull=False)
+            .select_related("user", "test", "result")
+            .defer("test__answer_key")
+            .order_by("id")
+        )
+        if options["date_from"]:
+            attempts = attempts.filter(end_time__date__gte=options["date_from"])
+        if options["date_to"]:
+            attempts = attempts.filter(end_time__date__lte=options["date_to"])
+        if options["test"]:
+            attempts = attempts.filter(test_id=options["test"])
+
+        jobs = []
+        skipped = 0
+        for attempt in attempts.iterator(chunk_size=CHUNK_SIZE):
+            inputs = certificate_inputs(attempt)
+            digest = certificate_digest(inputs)
+
+            if not options["force"] and default_storage.exists(certificate_path(attempt.id, digest)):
+                skipped += 1
+                continue
+
+            jobs.append((attempt.id, digest, inputs))
+
+        return jobs, skipped
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from quizzes.dashboard import invalidate_dashboard_stats
+from quizzes.models import UserStats
+from quizzes.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the UserStats rollup from completed attempts. Run once after "
+        "deploying it, and again after bulk-deleting or editing attempts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="users", help="Only this user ID (repeatable).")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per read and write batch (default: 1000).")
+
+    def handle(self, *args, **options):
+        written = rebuild_user_stats(options["users"], batch_size=options["batch_size"])
+
+        user_ids = options["users"] or UserStats.objects.values_list("user_id", flat=True)
+        for user_id in user_ids:
+            invalidate_dashboard_stats(user_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {written} users."))
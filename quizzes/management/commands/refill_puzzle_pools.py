@@ -0,0 +1,48 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizzes.models import DIFFICULTY_LEVELS
+from quizzes.practice import LOGIC_POOL_SIZE, SUDOKU_POOL_SIZE, fill_logic_pool, fill_sudoku_pool
+
+DIFFICULTY_CODES = [code for code, _ in DIFFICULTY_LEVELS]
+
+
+class Command(BaseCommand):
+    help = (
+        "Top up the pre-generated practice puzzle pools. Safe to run from cron: "
+        "only empty slots are generated unless --replace is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size", type=int, default=SUDOKU_POOL_SIZE,
+            help=f"Sudoku puzzles per difficulty (default: {SUDOKU_POOL_SIZE}).",
+        )
+        parser.add_argument(
+            "--logic-size", type=int, default=LOGIC_POOL_SIZE,
+            help=f"Logic puzzles per difficulty (default: {LOGIC_POOL_SIZE}).",
+        )
+        parser.add_argument(
+            "--difficulty", action="append", choices=DIFFICULTY_CODES,
+            help="Only this difficulty (repeatable; default: all).",
+        )
+        parser.add_argument("--replace", action="store_true", help="Regenerate every slot, rotating the pool.")
+        parser.add_argument("--seed", type=int, help="Random seed, for reproducible pools.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        pools = [
+            ("Sudoku", fill_sudoku_pool, options["size"]),
+            ("Logic", fill_logic_pool, options["logic_size"]),
+        ]
+        for label, fill, size in pools:
+            for difficulty in options["difficulty"] or DIFFICULTY_CODES:
+                start = time.perf_counter()
+                generated = fill(difficulty, size, replace=options["replace"], rng=rng)
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"{label} {difficulty}: generated {generated} puzzles in {elapsed:.1f}s")
+
+        self.stdout.write(self.style.SUCCESS("Puzzle pools are full."))
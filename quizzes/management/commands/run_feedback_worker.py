@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizzes.feedback import process_next_task
+
+
+class Command(BaseCommand):
+    help = "Drain the AI feedback queue, generating Gemini reports for completed tests."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Process every queued task and exit instead of polling forever.",
+        )
+        parser.add_argument(
+            "--sleep", type=float, default=2.0,
+            help="Seconds to wait between polls when the queue is empty (default: 2).",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Feedback worker started.")
+
+        while True:
+            task = process_next_task()
+
+            if task is not None:
+                self.stdout.write(f"Task {task.pk}: {task.status}")
+                continue
+
+            if options["once"]:
+                break
+
+            time.sleep(options["sleep"])
+
+        self.stdout.write(self.style.SUCCESS("Feedback queue drained."))
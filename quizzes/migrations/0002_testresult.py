@@ -0,0 +1,27 @@
+# Generated by Django 5.0.3 on 2026-10-18 00:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestResult',
+            fields=[
+                ('attempt', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='result', serialize=False, to='quizzes.usertestattempt')),
+                ('correct_count', models.IntegerField(default=0)),
+                ('total_questions', models.IntegerField(default=0)),
+                ('score_percentage', models.FloatField(default=0)),
+                ('iq_score', models.IntegerField(default=0)),
+                ('category_results', models.JSONField(default=list)),
+                ('ai_feedback', models.TextField(blank=True)),
+                ('computed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-18 00:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_testresult'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('result', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feedback_task', to='quizzes.testresult')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='feedbacktask_status_created')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.3 on 2026-10-18 01:01
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_answers(apps, schema_editor):
+    """Keep only the newest answer per (attempt, question) before the constraint lands."""
+    UserAnswer = apps.get_model('quizzes', 'UserAnswer')
+
+    duplicates = (
+        UserAnswer.objects
+        .values('attempt_id', 'question_id')
+        .annotate(keep_id=Max('id'), n=models.Count('id'))
+        .filter(n__gt=1)
+    )
+    for dup in duplicates:
+        UserAnswer.objects.filter(
+            attempt_id=dup['attempt_id'],
+            question_id=dup['question_id'],
+        ).exclude(id=dup['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_feedbackcacheentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_answers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='useranswer',
+            constraint=models.UniqueConstraint(fields=('attempt', 'question'), name='useranswer_attempt_question_uniq'),
+        ),
+    ]
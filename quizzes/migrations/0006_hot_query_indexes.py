@@ -0,0 +1,35 @@
+# Generated by Django 5.0.3 on 2026-10-18 01:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_useranswer_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='answer',
+            index=models.Index(fields=['question', 'is_correct'], name='answer_question_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['test', 'id'], name='question_test_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['test', 'category'], name='question_test_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertestattempt',
+            index=models.Index(fields=['user', '-end_time'], name='attempt_user_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usertestattempt',
+            index=models.Index(fields=['user', 'is_completed'], name='attempt_user_completed_idx'),
+        ),
+    ]
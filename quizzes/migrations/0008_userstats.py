@@ -0,0 +1,31 @@
+# Generated by Django 5.0.3 on 2026-10-18 01:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('quizzes', '0007_test_answer_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='test_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('attempt_count', models.IntegerField(default=0)),
+                ('iq_mean', models.FloatField(default=0)),
+                ('iq_m2', models.FloatField(default=0)),
+                ('best_iq', models.IntegerField(default=0)),
+                ('last_iq', models.IntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('category_totals', models.JSONField(default=dict)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
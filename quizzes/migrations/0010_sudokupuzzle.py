@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 01:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0009_score_histogram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SudokuPuzzle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('difficulty', models.CharField(choices=[('E', 'Easy'), ('M', 'Medium'), ('H', 'Hard')], default='M', max_length=1)),
+                ('slot', models.PositiveIntegerField()),
+                ('puzzle', models.CharField(max_length=81)),
+                ('solution', models.CharField(max_length=81)),
+                ('clues', models.PositiveSmallIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='sudokupuzzle',
+            constraint=models.UniqueConstraint(fields=('difficulty', 'slot'), name='sudoku_difficulty_slot_uniq'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.3 on 2026-10-18 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0010_sudokupuzzle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogicPuzzle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('difficulty', models.CharField(choices=[('E', 'Easy'), ('M', 'Medium'), ('H', 'Hard')], default='M', max_length=1)),
+                ('slot', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('arithmetic', 'Arithmetic'), ('geometric', 'Geometric'), ('fibonacci', 'Fibonacci-like'), ('interleaved', 'Interleaved'), ('letters', 'Letter series')], max_length=20)),
+                ('question', models.CharField(max_length=255)),
+                ('answer', models.CharField(max_length=50)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='logicpuzzle',
+            constraint=models.UniqueConstraint(fields=('difficulty', 'slot'), name='logic_difficulty_slot_uniq'),
+        ),
+    ]
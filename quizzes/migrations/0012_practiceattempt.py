@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-18 01:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0011_logicpuzzle'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PracticeAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question', models.CharField(max_length=255)),
+                ('difficulty', models.CharField(choices=[('E', 'Easy'), ('M', 'Medium'), ('H', 'Hard')], max_length=1)),
+                ('kind', models.CharField(choices=[('arithmetic', 'Arithmetic'), ('geometric', 'Geometric'), ('fibonacci', 'Fibonacci-like'), ('interleaved', 'Interleaved'), ('letters', 'Letter series')], max_length=20)),
+                ('answer', models.CharField(max_length=50)),
+                ('is_correct', models.BooleanField()),
+                ('answered_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='practice_attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-answered_at'], name='practice_user_recent_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-18 01:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0012_practiceattempt'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('game_name', models.CharField(choices=[('memory', 'Memory Match'), ('sudoku', 'Sudoku'), ('puzzle', 'Logic Puzzle')], max_length=10)),
+                ('score', models.PositiveIntegerField()),
+                ('difficulty', models.CharField(blank=True, choices=[('E', 'Easy'), ('M', 'Medium'), ('H', 'Hard')], max_length=1)),
+                ('moves', models.PositiveIntegerField(blank=True, null=True)),
+                ('time_taken', models.FloatField(blank=True, null=True)),
+                ('pairs', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('played_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_scores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['game_name', '-score'], name='gamescore_game_best_idx'), models.Index(fields=['user', 'game_name', '-score'], name='gamescore_user_best_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Builds the TestResult snapshot for attempts completed before the model
+# existed, so their results pages keep working and test_submit never
+# re-scores them. Scores are the ones stored on the attempt at the time;
+# only the counts and category breakdown are recomputed. The report is the
+# local template: no Gemini call is queued for results nobody may reopen;
+# test_results queues one when such a result is viewed.
+
+from django.db import migrations
+
+from quizzes.feedback import template_feedback
+
+# Frozen copies of quizzes.scoring.CATEGORY_NAMES and category_iq
+CATEGORY_NAMES = {
+    "NR": "Numerical",
+    "VR": "Verbal",
+    "LR": "Logical",
+    "SR": "Spatial",
+    "MR": "Memory",
+}
+
+
+def category_iq(correct, total):
+    return int(60 + (correct / total) * 100)
+
+
+def backfill_results(apps, schema_editor):
+    UserTestAttempt = apps.get_model("quizzes", "UserTestAttempt")
+    Question = apps.get_model("quizzes", "Question")
+    UserAnswer = apps.get_model("quizzes", "UserAnswer")
+    TestResult = apps.get_model("quizzes", "TestResult")
+
+    attempts = UserTestAttempt.objects.filter(is_completed=True, result__isnull=True)
+
+    categories_by_test = {}
+    for attempt in attempts.iterator(chunk_size=500):
+        categories = categories_by_test.get(attempt.test_id)
+        if categories is None:
+            categories = dict(Question.objects.filter(test_id=attempt.test_id).values_list("id", "category"))
+            categories_by_test[attempt.test_id] = categories
+
+        correct_ids = set(
+            UserAnswer.objects
+            .filter(attempt_id=attempt.pk, selected_answer__is_correct=True)
+            .values_list("question_id", flat=True)
+        )
+
+        per_category = {}
+        for question_id, category in categories.items():
+            cat = per_category.setdefault(category, {"correct": 0, "total": 0})
+            cat["total"] += 1
+            cat["correct"] += question_id in correct_ids
+
+        correct_count = len(correct_ids & categories.keys())
+        category_results = [
+            {
+                "name": name,
+                "correct": per_category[code]["correct"],
+                "total": per_category[code]["total"],
+                "iq": category_iq(per_category[code]["correct"], per_category[code]["total"]),
+            }
+            for code, name in CATEGORY_NAMES.items()
+            if code in per_category
+        ]
+        TestResult.objects.create(
+            attempt_id=attempt.pk,
+            correct_count=correct_count,
+            total_questions=len(categories),
+            score_percentage=attempt.score,
+            iq_score=int(attempt.iq_score),
+            category_results=category_results,
+            ai_feedback=template_feedback(int(attempt.iq_score), category_results, correct_count, len(categories)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0013_gamescore'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_results, migrations.RunPython.noop),
+    ]
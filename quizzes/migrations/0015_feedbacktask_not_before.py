@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0014_backfill_testresults'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedbacktask',
+            name='not_before',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-18 02:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0015_feedbacktask_not_before'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreClaim',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('once_key', models.CharField(max_length=50)),
+                ('hints', models.PositiveSmallIntegerField(default=0)),
+                ('scored_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_claims', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='scoreclaim',
+            constraint=models.UniqueConstraint(fields=('user', 'once_key'), name='scoreclaim_user_key_uniq'),
+        ),
+    ]
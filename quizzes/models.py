@@ -21,6 +21,11 @@ class Test(models.Model):
     description = models.TextField(blank=True)
     duration = models.IntegerField(help_text="Duration in minutes")
 
+    # Denormalized grading data, republished whenever questions/answers change
+    # (see quizzes.scoring.publish_answer_key)
+    answer_key = models.JSONField(default=dict, blank=True, editable=False)
+    answer_key_version = models.PositiveIntegerField(default=0, editable=False)
+
     def __str__(self):
         return self.title
 
@@ -50,6 +55,12 @@ class Question(models.Model):
 
     objects = QuestionManager()  # NATURAL KEY MANAGER
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['test', 'id'], name='question_test_id_idx'),
+            models.Index(fields=['test', 'category'], name='question_test_category_idx'),
+        ]
+
     def __str__(self):
         return self.text[:80]
 
@@ -62,6 +73,11 @@ class Answer(models.Model):
     text = models.CharField(max_length=255)
     is_correct = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['question', 'is_correct'], name='answer_question_correct_idx'),
+        ]
+
     # NO natural-key logic here — PK JSON is cleaner & safer
     def __str__(self):
         return f"{self.text} ({'✔' if self.is_correct else '✖'})"
@@ -76,6 +92,13 @@ class UserTestAttempt(models.Model):
     score = models.FloatField(default=0)
     iq_score = models.FloatField(default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-end_time'], name='attempt_user_end_idx'),
+            models.Index(fields=['user', 'is_completed'], name='attempt_user_completed_idx'),
+            models.Index(fields=['test', 'is_completed', '-iq_score'], name='attempt_test_iq_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.test.title}"
 
@@ -86,5 +109,223 @@ class UserAnswer(models.Model):
     selected_answer = models.ForeignKey(Answer, on_delete=models.CASCADE, null=True, blank=True)
     text_input = models.TextField(blank=True, null=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['attempt', 'question'], name='useranswer_attempt_question_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.attempt.user.username} - {self.question.text[:40]}"
+
+
+class TestResult(models.Model):
+    """Scored snapshot of a completed attempt, written once at submission."""
+    attempt = models.OneToOneField(UserTestAttempt, on_delete=models.CASCADE, primary_key=True, related_name='result')
+    correct_count = models.IntegerField(default=0)
+    total_questions = models.IntegerField(default=0)
+    score_percentage = models.FloatField(default=0)
+    iq_score = models.IntegerField(default=0)
+    category_results = models.JSONField(default=list)  # [{"name", "correct", "total", "iq"}, ...]
+    ai_feedback = models.TextField(blank=True)
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.attempt} - IQ {self.iq_score}"
+
+
+class FeedbackTask(models.Model):
+    """Queued AI feedback generation for a TestResult, drained by run_feedback_worker."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    result = models.OneToOneField(TestResult, on_delete=models.CASCADE, related_name='feedback_task')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    not_before = models.DateTimeField(null=True, blank=True)  # retry backoff while Gemini is down
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='feedbacktask_status_created'),
+        ]
+
+    def __str__(self):
+        return f"Feedback for {self.result.attempt} ({self.status})"
+
+
+class FeedbackCacheEntry(models.Model):
+    """Persistent AI feedback keyed by a hash of the prompt inputs (see quizzes.feedback)."""
+    key = models.CharField(max_length=64, primary_key=True)  # sha256 hex digest
+    feedback = models.TextField()
+    hits = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.key
+
+
+class UserStats(models.Model):
+    """Running totals over a user's completed attempts, updated at submission (see quizzes.stats)."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='test_stats')
+    attempt_count = models.IntegerField(default=0)
+    iq_mean = models.FloatField(default=0)
+    iq_m2 = models.FloatField(default=0)  # sum of squared deviations from the mean (Welford)
+    best_iq = models.IntegerField(default=0)
+    last_iq = models.IntegerField(default=0)
+    score_sum = models.FloatField(default=0)  # of score percentages, for average accuracy
+    category_totals = models.JSONField(default=dict)  # {"Numerical": {"correct": n, "total": m}, ...}
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def iq_variance(self):
+        return self.iq_m2 / self.attempt_count if self.attempt_count else 0
+
+    @property
+    def average_score(self):
+        return self.score_sum / self.attempt_count if self.attempt_count else 0
+
+    def __str__(self):
+        return f"{self.user.username} - {self.attempt_count} attempts"
+
+
+class TestScoreHistogram(models.Model):
+    """Completed-attempt counts per IQ point for a test, updated at submission (see quizzes.rankings)."""
+    test = models.OneToOneField(Test, on_delete=models.CASCADE, primary_key=True, related_name='score_histogram')
+    counts = models.JSONField(default=list)  # counts[i] = attempts scoring IQ_MIN + i
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.test.title} - {sum(self.counts)} scores"
+
+
+class SudokuPuzzle(models.Model):
+    """Pre-generated unique-solution Sudoku served by the practice page (see quizzes.practice)."""
+    difficulty = models.CharField(max_length=1, choices=DIFFICULTY_LEVELS, default='M')
+    slot = models.PositiveIntegerField()  # 0..pool size - 1 per difficulty, for O(1) random picks
+    puzzle = models.CharField(max_length=81)  # row by row, "0" for blanks
+    solution = models.CharField(max_length=81)
+    clues = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['difficulty', 'slot'], name='sudoku_difficulty_slot_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Sudoku {self.get_difficulty_display()} #{self.slot} ({self.clues} clues)"
+
+
+class LogicPuzzle(models.Model):
+    """Pre-generated "what comes next?" puzzle served by the practice page (see quizzes.practice)."""
+    KIND_CHOICES = [
+        ('arithmetic', 'Arithmetic'),
+        ('geometric', 'Geometric'),
+        ('fibonacci', 'Fibonacci-like'),
+        ('interleaved', 'Interleaved'),
+        ('letters', 'Letter series'),
+    ]
+
+    difficulty = models.CharField(max_length=1, choices=DIFFICULTY_LEVELS, default='M')
+    slot = models.PositiveIntegerField()  # 0..pool size - 1 per difficulty, for O(1) random picks
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    question = models.CharField(max_length=255)
+    answer = models.CharField(max_length=50)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['difficulty', 'slot'], name='logic_difficulty_slot_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.get_difficulty_display()} #{self.slot}"
+
+
+class PracticeAttempt(models.Model):
+    """
+    One graded answer to a practice logic puzzle. Written through
+    quizzes.buffers, in batches when WRITE_BUFFER_REDIS_URL is set, so rows
+    can lag the answer by up to WRITE_BUFFER_MAX_AGE.
+    The puzzle is copied rather than linked: pool slots are overwritten when
+    the pool rotates.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='practice_attempts')
+    question = models.CharField(max_length=255)
+    difficulty = models.CharField(max_length=1, choices=DIFFICULTY_LEVELS)
+    kind = models.CharField(max_length=20, choices=LogicPuzzle.KIND_CHOICES)
+    answer = models.CharField(max_length=50)
+    is_correct = models.BooleanField()
+    answered_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Per-user practice stats and recent-accuracy lookups
+            models.Index(fields=['user', '-answered_at'], name='practice_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.kind} ({'correct' if self.is_correct else 'wrong'})"
+
+
+class GameScore(models.Model):
+    """
+    A finished practice game. Written through quizzes.buffers, like
+    PracticeAttempt. Higher scores are better for every game.
+    """
+    GAME_CHOICES = [
+        ('memory', 'Memory Match'),
+        ('sudoku', 'Sudoku'),
+        ('puzzle', 'Logic Puzzle'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='game_scores')
+    game_name = models.CharField(max_length=10, choices=GAME_CHOICES)
+    score = models.PositiveIntegerField()
+    difficulty = models.CharField(max_length=1, choices=DIFFICULTY_LEVELS, blank=True)
+    moves = models.PositiveIntegerField(null=True, blank=True)        # memory
+    time_taken = models.FloatField(null=True, blank=True)             # seconds, memory
+    pairs = models.PositiveSmallIntegerField(null=True, blank=True)   # memory
+    played_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Best scores: per game overall, and per user and game
+            models.Index(fields=['game_name', '-score'], name='gamescore_game_best_idx'),
+            models.Index(fields=['user', 'game_name', '-score'], name='gamescore_user_best_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.get_game_name_display()}: {self.score}"
+
+
+class ScoreClaim(models.Model):
+    """
+    A user's claim on one puzzle's score (see quizzes.practice.record_game_score):
+    a solve scores once per SCORE_ONCE_TIMEOUT, less a penalty per hint taken.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='score_claims')
+    once_key = models.CharField(max_length=50)  # e.g. "sudoku:<puzzle id>"
+    hints = models.PositiveSmallIntegerField(default=0)
+    scored_at = models.DateTimeField(null=True, blank=True)  # None until solved
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'once_key'], name='scoreclaim_user_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.once_key}"
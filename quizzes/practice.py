@@ -0,0 +1,437 @@
+# quizzes/practice.py
+
+import math
+import random
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from . import logic_puzzles, sudoku
+from .buffers import WriteBuffer, register
+from .models import DIFFICULTY_LEVELS, GameScore, LogicPuzzle, PracticeAttempt, ScoreClaim, SudokuPuzzle
+
+# Puzzles kept per difficulty by refill_puzzle_pools
+SUDOKU_POOL_SIZE = 200
+LOGIC_POOL_SIZE = 300
+
+# Numeric answers within this (relative or absolute) distance count as equal
+ANSWER_TOLERANCE = 1e-6
+
+# Adaptive difficulty: judged on the latest answers at the current level
+ADAPT_WINDOW = 10          # recent answers looked at
+ADAPT_MIN_ANSWERS = 5      # at the current level before moving
+PROMOTE_ACCURACY = 0.8
+DEMOTE_ACCURACY = 0.4
+
+# Game scores for a solved puzzle, by difficulty
+SUDOKU_POINTS = {"E": 100, "M": 200, "H": 300}
+LOGIC_POINTS = {"E": 10, "M": 20, "H": 30}
+
+# Each Sudoku hint takes this share off the puzzle's points (five leave none)
+SUDOKU_HINT_PENALTY = 0.2
+
+# A puzzle solved again within this window does not score twice
+SCORE_ONCE_TIMEOUT = 60 * 60 * 24  # seconds
+
+
+# -----------------------------
+# PUZZLE POOLS
+# -----------------------------
+# Each difficulty holds puzzles in slots 0..N-1, so a random pick is a random
+# slot plus one unique-index lookup, never ORDER BY RANDOM(). Puzzles are
+# generated locally (quizzes/sudoku.py, quizzes/logic_puzzles.py); page views
+# never wait on a network. Reads are async, for the async practice views.
+
+def pool_size_key(model, difficulty):
+    return f"{model._meta.model_name}_pool_size:{difficulty}"
+
+
+async def apool_size(model, difficulty):
+    key = pool_size_key(model, difficulty)
+    size = await cache.aget(key)
+    if size is None:
+        last_slot = (await model.objects.filter(difficulty=difficulty).aaggregate(last=Max("slot")))["last"]
+        size = 0 if last_slot is None else last_slot + 1
+        await cache.aset(key, size, settings.PRACTICE_POOL_CACHE_TIMEOUT)
+    return size
+
+
+def fill_pool(model, difficulty, size, make, update_fields, replace=False):
+    """
+    Fill the empty slots 0..size-1 of a difficulty with make(slot) (every
+    slot when `replace`, rotating the pool) and drop slots beyond `size`.
+    Returns the number of puzzles generated.
+    """
+    pool = model.objects.filter(difficulty=difficulty)
+
+    taken = set() if replace else set(pool.values_list("slot", flat=True))
+    rows = [make(slot) for slot in range(size) if slot not in taken]
+
+    model.objects.bulk_create(
+        rows,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=["difficulty", "slot"],
+        update_fields=update_fields,
+    )
+    pool.filter(slot__gte=size).delete()
+    cache.delete(pool_size_key(model, difficulty))
+
+    return len(rows)
+
+
+async def arandom_from_pool(model, difficulty, make):
+    """
+    A random pooled puzzle, for the async practice views. An empty pool
+    (fresh install) gets make(0) inline, generated in a worker thread.
+    """
+    size = await apool_size(model, difficulty)
+    if size:
+        puzzle = await model.objects.filter(difficulty=difficulty, slot=random.randrange(size)).afirst()
+        if puzzle is not None:
+            return puzzle
+    else:
+        first = await sync_to_async(make, thread_sensitive=False)(0)
+        await model.objects.abulk_create([first], ignore_conflicts=True)
+        await cache.adelete(pool_size_key(model, difficulty))
+
+    return await model.objects.filter(difficulty=difficulty).order_by("slot").afirst()
+
+
+# -----------------------------
+# SUDOKU
+# -----------------------------
+def new_sudoku(difficulty, slot, rng=None):
+    puzzle, solution = sudoku.generate(difficulty, rng)
+    return SudokuPuzzle(
+        difficulty=difficulty,
+        slot=slot,
+        puzzle=puzzle,
+        solution=solution,
+        clues=81 - puzzle.count("0"),
+    )
+
+
+def fill_sudoku_pool(difficulty, size=SUDOKU_POOL_SIZE, replace=False, rng=None):
+    rng = rng or random.Random()
+    return fill_pool(
+        SudokuPuzzle, difficulty, size,
+        make=lambda slot: new_sudoku(difficulty, slot, rng),
+        update_fields=["puzzle", "solution", "clues"],
+        replace=replace,
+    )
+
+
+async def arandom_sudoku(difficulty):
+    return await arandom_from_pool(SudokuPuzzle, difficulty, lambda slot: new_sudoku(difficulty, slot))
+
+
+# -----------------------------
+# LOGIC PUZZLES
+# -----------------------------
+def new_logic_puzzle(difficulty, slot, rng=None, avoid=()):
+    """
+    A LogicPuzzle of a random kind. Questions in `avoid` are redrawn a few
+    times so a pool is not full of repeats; the narrow kinds (easy geometric
+    series, say) only have a few dozen distinct puzzles, so one may remain.
+    """
+    rng = rng or random.Random()
+    kind = rng.choice(list(logic_puzzles.GENERATORS))
+    for _ in range(10):
+        kind, question, answer = logic_puzzles.generate(difficulty, kind, rng)
+        if question not in avoid:
+            break
+    return LogicPuzzle(
+        difficulty=difficulty,
+        slot=slot,
+        kind=kind,
+        question=question,
+        answer=answer,
+    )
+
+
+def fill_logic_pool(difficulty, size=LOGIC_POOL_SIZE, replace=False, rng=None):
+    rng = rng or random.Random()
+    seen = set() if replace else set(
+        LogicPuzzle.objects.filter(difficulty=difficulty).values_list("question", flat=True)
+    )
+
+    def make(slot):
+        puzzle = new_logic_puzzle(difficulty, slot, rng, avoid=seen)
+        seen.add(puzzle.question)
+        return puzzle
+
+    return fill_pool(
+        LogicPuzzle, difficulty, size,
+        make=make,
+        update_fields=["kind", "question", "answer"],
+        replace=replace,
+    )
+
+
+async def arandom_logic_puzzle(difficulty):
+    return await arandom_from_pool(LogicPuzzle, difficulty, lambda slot: new_logic_puzzle(difficulty, slot))
+
+
+# -----------------------------
+# ANSWER CHECKING
+# -----------------------------
+def normalize_answer(text):
+    """Case-folded, with runs of whitespace collapsed ("  q " and "Q" match)."""
+    return " ".join(str(text).split()).casefold()
+
+
+def parse_number(text):
+    """Float value of an answer ("1,024", "32.0", "- 46"), or None if it is not a number."""
+    try:
+        value = float("".join(text.split()).replace(",", ""))
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
+
+
+def answers_match(given, expected):
+    given, expected = normalize_answer(given), normalize_answer(expected)
+    if given == expected:
+        return True
+
+    a, b = parse_number(given), parse_number(expected)
+    if a is None or b is None:
+        return False
+    return math.isclose(a, b, rel_tol=ANSWER_TOLERANCE, abs_tol=ANSWER_TOLERANCE)
+
+
+# -----------------------------
+# PRACTICE ATTEMPTS + STATS
+# -----------------------------
+# Answers are graded at once but stored through a write buffer, so with a
+# buffer cache a burst of guesses costs Redis writes, not INSERTs. Stats (and the difficulty
+# suggestion built on them) are cached per user and refreshed when a flush
+# writes that user's rows.
+
+def practice_stats_cache_key(user_id):
+    return f"practice_stats:{user_id}"
+
+
+def invalidate_practice_stats(user_ids):
+    cache.delete_many([practice_stats_cache_key(user_id) for user_id in user_ids])
+
+
+def practice_attempts_flushed(attempts):
+    invalidate_practice_stats({attempt.user_id for attempt in attempts})
+
+
+attempt_buffer = register(WriteBuffer("practice_attempts", PracticeAttempt, on_flush=practice_attempts_flushed))
+
+
+def grade_answer(puzzle, answer, user=None):
+    """Whether `answer` solves the puzzle; recorded for signed-in users."""
+    is_correct = answers_match(answer, puzzle.answer)
+
+    if is_correct:
+        record_game_score(
+            user, "puzzle", LOGIC_POINTS[puzzle.difficulty],
+            once_key=f"puzzle:{puzzle.pk}",
+            difficulty=puzzle.difficulty,
+        )
+
+    if user is not None and user.is_authenticated:
+        attempt_buffer.add(
+            user_id=user.id,
+            question=puzzle.question,
+            difficulty=puzzle.difficulty,
+            kind=puzzle.kind,
+            answer=str(answer)[:50],
+            is_correct=is_correct,
+            answered_at=timezone.now(),
+        )
+
+    return is_correct
+
+
+def suggest_difficulty(recent, default="M"):
+    """
+    Level for the next puzzle from the newest-first (difficulty, is_correct)
+    pairs: up a level after PROMOTE_ACCURACY at the current one, down after
+    DEMOTE_ACCURACY, otherwise stay.
+    """
+    if not recent:
+        return default
+
+    levels = [code for code, _ in DIFFICULTY_LEVELS]
+    current = recent[0][0]
+    results = [is_correct for difficulty, is_correct in recent if difficulty == current]
+    if len(results) < ADAPT_MIN_ANSWERS:
+        return current
+
+    accuracy = sum(results) / len(results)
+    i = levels.index(current)
+    if accuracy >= PROMOTE_ACCURACY and i < len(levels) - 1:
+        return levels[i + 1]
+    if accuracy <= DEMOTE_ACCURACY and i > 0:
+        return levels[i - 1]
+    return current
+
+
+async def abuild_practice_stats(user_id):
+    attempts = PracticeAttempt.objects.filter(user_id=user_id)
+
+    levels = {}
+    totals = (
+        attempts.values("difficulty")
+        .annotate(answered=Count("id"), correct=Count("id", filter=Q(is_correct=True)))
+        .order_by()
+    )
+    async for row in totals:
+        levels[row["difficulty"]] = {
+            "answered": row["answered"],
+            "correct": row["correct"],
+            "accuracy": round(row["correct"] / row["answered"] * 100),
+        }
+
+    recent = [
+        row async for row in
+        attempts.order_by("-answered_at").values_list("difficulty", "is_correct")[:ADAPT_WINDOW]
+    ]
+
+    return {
+        "answered": sum(level["answered"] for level in levels.values()),
+        "correct": sum(level["correct"] for level in levels.values()),
+        "levels": levels,
+        "suggested_difficulty": suggest_difficulty(recent),
+    }
+
+
+async def aget_practice_stats(user_id):
+    key = practice_stats_cache_key(user_id)
+    stats = await cache.aget(key)
+    if stats is None:
+        stats = await abuild_practice_stats(user_id)
+        await cache.aset(key, stats, settings.PRACTICE_STATS_CACHE_TIMEOUT)
+    return stats
+
+
+# -----------------------------
+# GAME SCORES
+# -----------------------------
+# Every finished game goes through a write buffer like practice answers do.
+# Best scores (the user's own and each game's overall) are cached and
+# refreshed when a flush writes new scores.
+
+def memory_score(moves, time_taken, pairs):
+    """100 per pair with perfect recall (one move per pair), scaled by accuracy, less a point per second."""
+    if pairs <= 0:
+        return 0
+    accuracy = pairs / max(moves, pairs)
+    return max(0, round(pairs * 100 * accuracy - time_taken))
+
+
+def best_scores_cache_key(user_id=None):
+    return f"best_scores:{user_id or 'all'}"
+
+
+def invalidate_best_scores(user_ids):
+    cache.delete_many([best_scores_cache_key()] + [best_scores_cache_key(user_id) for user_id in user_ids])
+
+
+def game_scores_flushed(scores):
+    invalidate_best_scores({score.user_id for score in scores})
+
+
+score_buffer = register(WriteBuffer("game_scores", GameScore, on_flush=game_scores_flushed))
+
+
+def record_game_score(user, game_name, score, once_key=None, **fields):
+    """
+    Buffer a score for a signed-in user; returns whether it was recorded.
+    With `once_key` only the first score under that key within
+    SCORE_ONCE_TIMEOUT counts, so checking an already solved puzzle again
+    does not score twice.
+    """
+    if user is None or not user.is_authenticated:
+        return False
+    if once_key is not None and not claim_score(user, once_key):
+        return False
+
+    score_buffer.add(
+        user_id=user.id,
+        game_name=game_name,
+        score=score,
+        played_at=timezone.now(),
+        **fields,
+    )
+    return True
+
+
+# The claims live in the database rather than the cache: with a per-process
+# cache each worker would let a puzzle score once, and forget its hints.
+
+def locked_claim(user, once_key):
+    """
+    The user's ScoreClaim for `once_key`, locked for update (call inside a
+    transaction). A claim scored longer than SCORE_ONCE_TIMEOUT ago is
+    reset: the puzzle may have been replaced in its pool slot since.
+    """
+    claim, _ = ScoreClaim.objects.select_for_update().get_or_create(user=user, once_key=once_key)
+    if claim.scored_at is not None and claim.scored_at < timezone.now() - timedelta(seconds=SCORE_ONCE_TIMEOUT):
+        claim.scored_at = None
+        claim.hints = 0
+    return claim
+
+
+def claim_score(user, once_key):
+    """Mark `once_key` scored for the user; False if it already was."""
+    with transaction.atomic():
+        claim = locked_claim(user, once_key)
+        if claim.scored_at is not None:
+            return False
+        claim.scored_at = timezone.now()
+        claim.save(update_fields=["scored_at", "hints"])
+    return True
+
+
+def sudoku_once_key(puzzle):
+    return f"sudoku:{puzzle.pk}"
+
+
+def count_sudoku_hint(user, puzzle):
+    """Note a hint given to a signed-in user; each one lowers sudoku_points."""
+    if user is None or not user.is_authenticated:
+        return
+    with transaction.atomic():
+        claim = locked_claim(user, sudoku_once_key(puzzle))
+        claim.hints += 1
+        claim.save(update_fields=["scored_at", "hints"])
+
+
+def sudoku_points(user, puzzle):
+    """The puzzle's points less SUDOKU_HINT_PENALTY of them per hint the user took."""
+    hints = 0
+    if user.is_authenticated:
+        claim = ScoreClaim.objects.filter(user=user, once_key=sudoku_once_key(puzzle)).first()
+        if claim is not None and claim.scored_at is None:
+            hints = claim.hints
+    return max(0, round(SUDOKU_POINTS[puzzle.difficulty] * (1 - SUDOKU_HINT_PENALTY * hints)))
+
+
+def build_best_scores(user_id=None):
+    scores = GameScore.objects.all()
+    if user_id is not None:
+        scores = scores.filter(user_id=user_id)
+    best = scores.values("game_name").annotate(best=Max("score")).order_by()
+    return {row["game_name"]: row["best"] for row in best}
+
+
+def get_best_scores(user_id=None):
+    """{game_name: best score} for one user, or across everyone."""
+    key = best_scores_cache_key(user_id)
+    best = cache.get(key)
+    if best is None:
+        best = build_best_scores(user_id)
+        cache.set(key, best, settings.PRACTICE_STATS_CACHE_TIMEOUT)
+    return best
@@ -0,0 +1,144 @@
+# quizzes/rankings.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import TestScoreHistogram, UserTestAttempt
+
+# Histogram range: every IQ ratio_to_iq can produce gets its own bucket
+IQ_MIN = 60
+IQ_MAX = 160
+
+# Users shown on a test's leaderboard
+LEADERBOARD_SIZE = 10
+
+
+# -----------------------------
+# SCORE HISTOGRAMS + PERCENTILES
+# -----------------------------
+# One row per test holding how many completed attempts scored each IQ,
+# bumped under a row lock at submission. A percentile is a pass over the
+# IQ_MAX - IQ_MIN + 1 buckets, never over the attempts table.
+
+def bucket(iq_score):
+    return max(IQ_MIN, min(IQ_MAX, int(iq_score))) - IQ_MIN
+
+
+def histogram_from_attempts(test_id):
+    """Bucket counts rebuilt from the test's completed attempts (one grouped query)."""
+    counts = [0] * (IQ_MAX - IQ_MIN + 1)
+    scores = (
+        UserTestAttempt.objects
+        .filter(test_id=test_id, is_completed=True)
+        .values_list("iq_score")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    for iq_score, n in scores:
+        counts[bucket(iq_score)] += n
+    return counts
+
+
+def locked_histogram(test_id):
+    """
+    The test's histogram row, locked for update (call inside a transaction).
+    A missing row is created from existing attempts. Returns (histogram, created).
+    """
+    histogram, created = TestScoreHistogram.objects.select_for_update().get_or_create(test_id=test_id)
+    if created:
+        histogram.counts = histogram_from_attempts(test_id)
+        histogram.save(update_fields=["counts", "updated_at"])
+    return histogram, created
+
+
+def get_histogram(test_id):
+    histogram = TestScoreHistogram.objects.filter(test_id=test_id).first()
+    if histogram is None:
+        with transaction.atomic():
+            histogram, _ = locked_histogram(test_id)
+    return histogram
+
+
+def percentile_rank(counts, iq_score):
+    """
+    Share of the other attempts scoring strictly below `iq_score`, in 0..100.
+    `counts` includes the attempt being ranked, which is left out; None if
+    there is no other attempt.
+    """
+    i = bucket(iq_score)
+    others = sum(counts) - min(counts[i], 1)
+    if not others:
+        return None
+
+    below = sum(counts[:i])
+    return round(below / others * 100)
+
+
+def record_score(attempt, iq_score):
+    """
+    Add a just-completed attempt to its test's histogram and refresh the
+    leaderboard if the score could enter it. Call inside the transaction that
+    completes the attempt.
+    """
+    with transaction.atomic():
+        histogram, created = locked_histogram(attempt.test_id)
+        # A row created just now was built from attempts that include this one
+        if not created:
+            histogram.counts[bucket(iq_score)] += 1
+            histogram.save(update_fields=["counts", "updated_at"])
+
+    board = cache.get(leaderboard_cache_key(attempt.test_id))
+    if board is not None and (len(board) < LEADERBOARD_SIZE or iq_score >= board[-1]["iq_score"]):
+        transaction.on_commit(lambda: invalidate_leaderboard(attempt.test_id))
+
+
+# -----------------------------
+# LEADERBOARD (cached top-N per test)
+# -----------------------------
+def leaderboard_cache_key(test_id):
+    return f"leaderboard:{test_id}"
+
+
+def build_leaderboard(test_id, size=LEADERBOARD_SIZE):
+    """
+    Each user's best attempt, top `size` users first. Walks the (test, -iq_score)
+    index from the top and stops after `size` distinct users.
+    """
+    attempts = (
+        UserTestAttempt.objects
+        .filter(test_id=test_id, is_completed=True, end_time__isnull=False)
+        .order_by("-iq_score", "end_time")
+        .values_list("user_id", "user__username", "iq_score", "end_time")
+    )
+
+    board = []
+    seen = set()
+    for user_id, username, iq_score, end_time in attempts.iterator(chunk_size=size * 4):
+        if user_id in seen:
+            continue
+        seen.add(user_id)
+        board.append({
+            "user_id": user_id,
+            "username": username,
+            "iq_score": int(iq_score),
+            "date": end_time.date(),
+        })
+        if len(board) == size:
+            break
+
+    return board
+
+
+def get_leaderboard(test_id):
+    key = leaderboard_cache_key(test_id)
+    board = cache.get(key)
+    if board is None:
+        board = build_leaderboard(test_id)
+        cache.set(key, board, settings.LEADERBOARD_CACHE_TIMEOUT)
+    return board
+
+
+def invalidate_leaderboard(test_id):
+    cache.delete(leaderboard_cache_key(test_id))
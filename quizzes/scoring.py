@@ -0,0 +1,182 @@
+# quizzes/scoring.py
+
+from django.db import transaction
+from django.db.models import F
+
+from .models import Answer, Question, Test, UserAnswer
+
+# Points awarded per correct answer, by question difficulty
+DIFFICULTY_WEIGHTS = {"E": 1, "M": 2, "H": 3}
+
+# Display names used on the results page and the certificate (in display order)
+CATEGORY_NAMES = {
+    "NR": "Numerical",
+    "VR": "Verbal",
+    "LR": "Logical",
+    "SR": "Spatial",
+    "MR": "Memory",
+}
+
+
+# -----------------------------
+# IQ FORMULAS
+# -----------------------------
+def ratio_to_iq(ratio):
+    """Map a 0..1 weighted ratio onto a Gaussian IQ scale (mean 100, sd 15)."""
+    # Convert ratio to Z-score
+    z = (ratio - 0.5) * 3.2    # spreads nicely across typical human distribution
+
+    # Hard limits for human IQ range
+    return max(60, min(160, int(100 + 15 * z)))
+
+
+def category_iq(correct, total):
+    """Simplified linear IQ used for the per-category breakdown."""
+    return int(60 + (correct / total) * 100)
+
+
+# -----------------------------
+# ANSWER KEY
+# -----------------------------
+# Per test: {question_id: (correct answer ids, difficulty weight, category)}.
+# Published onto Test.answer_key when content changes and memoized per
+# process by Test.answer_key_version, so grading never joins Question/Answer.
+
+_answer_keys = {}  # test_id -> (version, key)
+
+
+def build_answer_key(test_id):
+    """JSON-ready answer key for a test, from two narrow queries."""
+    key = {
+        str(question_id): {
+            "correct": [],
+            "weight": DIFFICULTY_WEIGHTS.get(difficulty, 0),
+            "category": category,
+        }
+        for question_id, difficulty, category in (
+            Question.objects.filter(test_id=test_id).values_list("id", "difficulty", "category")
+        )
+    }
+
+    correct = Answer.objects.filter(question__test_id=test_id, is_correct=True).values_list("question_id", "id")
+    for question_id, answer_id in correct:
+        key[str(question_id)]["correct"].append(answer_id)
+
+    return key
+
+
+def publish_answer_key(test_id):
+    """
+    Rebuild and store a test's answer key. Returns (version, key), or None if
+    the test is gone. The row lock makes the key and its version one step, so
+    concurrent publishes cannot pair one's version with the other's key.
+    """
+    with transaction.atomic():
+        version = (
+            Test.objects.select_for_update()
+            .filter(pk=test_id)
+            .values_list("answer_key_version", flat=True)
+            .first()
+        )
+        if version is None:
+            return None
+
+        key = build_answer_key(test_id)
+        version += 1
+        Test.objects.filter(pk=test_id).update(answer_key=key, answer_key_version=version)
+    return version, key
+
+
+def reset_answer_key(test_id):
+    """Mark a test's key stale; it is republished on next use (fixture loads)."""
+    Test.objects.filter(pk=test_id).update(
+        answer_key={},
+        answer_key_version=F("answer_key_version") + 1,
+    )
+
+
+def get_answer_key(test_id, version):
+    """Answer key for `test_id` at `version`, from the in-process cache when current."""
+    cached = _answer_keys.get(test_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    version, raw = Test.objects.filter(pk=test_id).values_list("answer_key_version", "answer_key").get()
+    if not raw:
+        version, raw = publish_answer_key(test_id)
+
+    key = {
+        int(question_id): (frozenset(entry["correct"]), entry["weight"], entry["category"])
+        for question_id, entry in raw.items()
+    }
+    _answer_keys[test_id] = (version, key)
+    return key
+
+
+# -----------------------------
+# ATTEMPT SCORING
+# -----------------------------
+def score_attempt(attempt):
+    """
+    Score a test attempt against the test's answer key.
+
+    The only query is a values_list of the attempt's selected answer IDs;
+    grading is a dictionary pass over them. Load the attempt with
+    select_related("test") (deferring test__answer_key) so the key version
+    comes for free.
+
+    Returns a dict with: correct_count, total_questions, score_percentage,
+    ratio, iq_score and category_results (list of
+    {"name", "correct", "total", "iq"} dicts).
+    """
+    key = get_answer_key(attempt.test_id, attempt.test.answer_key_version)
+    selected = dict(
+        UserAnswer.objects.filter(attempt_id=attempt.pk).values_list("question_id", "selected_answer_id")
+    )
+
+    correct_count = 0
+    weighted_score = 0
+    max_weight = 0
+    per_category = {}
+
+    for question_id, (correct_ids, weight, category) in key.items():
+        cat = per_category.setdefault(category, {"correct": 0, "total": 0})
+        cat["total"] += 1
+        max_weight += weight
+
+        if selected.get(question_id) in correct_ids:
+            correct_count += 1
+            weighted_score += weight
+            cat["correct"] += 1
+
+    total_questions = len(key)
+
+    # Percentage score
+    if total_questions > 0:
+        score_percentage = round((correct_count / total_questions) * 100, 1)
+    else:
+        score_percentage = 0
+
+    ratio = weighted_score / max_weight if max_weight > 0 else 0  # 0..1 range
+
+    category_results = []
+    for code, name in CATEGORY_NAMES.items():
+        cat = per_category.get(code)
+        if not cat or cat["total"] == 0:
+            continue
+
+        category_results.append({
+            "name": name,
+            "correct": cat["correct"],
+            "total": cat["total"],
+            "iq": category_iq(cat["correct"], cat["total"]),
+        })
+
+    return {
+        "correct_count": correct_count,
+        "total_questions": total_questions,
+        "score_percentage": score_percentage,
+        "ratio": ratio,
+        "iq_score": ratio_to_iq(ratio),
+        "category_results": category_results,
+    }
@@ -0,0 +1,139 @@
+# quizzes/signals.py
+
+import threading
+import weakref
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .certificates import invalidate_verification
+from .dashboard import invalidate_dashboard_stats
+from .models import Answer, Question, Test, UserTestAttempt
+from .scoring import publish_answer_key, reset_answer_key
+
+
+# -----------------------------
+# CONTENT CHANGES: ANSWER KEY (+ BLUEPRINT VERSION)
+# -----------------------------
+# An admin save writes a question and its answers in one transaction, one
+# signal per row. The key is republished once, after commit, per test and
+# transaction. Pending publishes are held weakly: if their transaction rolls
+# back, Django drops the callback and the entry goes with it.
+_pending_publishes = threading.local()
+
+
+class Republish:
+    def __init__(self, test_id):
+        self.test_id = test_id
+        self.done = False
+
+    def __call__(self):
+        if not self.done:
+            self.done = True
+            publish_answer_key(self.test_id)
+
+
+def pending_publishes():
+    pending = getattr(_pending_publishes, "tests", None)
+    if pending is None:
+        pending = _pending_publishes.tests = weakref.WeakValueDictionary()
+    return pending
+
+
+def content_changed(test_id, raw=False):
+    if test_id is None:
+        return
+
+    # Fixture loads save rows out of order; republish lazily on first use.
+    # Either way answer_key_version moves on, which retires the cached blueprint.
+    if raw:
+        reset_answer_key(test_id)
+        return
+
+    pending = pending_publishes()
+    republish = pending.get(test_id)
+    if republish is None or republish.done:
+        republish = pending[test_id] = Republish(test_id)
+        transaction.on_commit(republish)
+
+
+@receiver(pre_save, sender=Question)
+def remember_previous_test(sender, instance, raw=False, **kwargs):
+    # A question moved to another test must drop out of the old test too
+    if instance.pk and not raw:
+        instance._previous_test_id = (
+            Question.objects.filter(pk=instance.pk).values_list("test_id", flat=True).first()
+        )
+
+
+# Tests and questions in the middle of a (cascading) delete, per thread.
+# Django sends every pre_delete before the first row goes, so the rows that
+# cascade from them can skip republishing a key that is about to go too.
+_deleting = threading.local()
+
+
+def deleting_ids(kind):
+    ids = getattr(_deleting, kind, None)
+    if ids is None:
+        ids = set()
+        setattr(_deleting, kind, ids)
+    return ids
+
+
+@receiver(pre_delete, sender=Test)
+def test_deleting(sender, instance, **kwargs):
+    deleting_ids("tests").add(instance.pk)
+
+
+@receiver(pre_delete, sender=Question)
+def question_deleting(sender, instance, **kwargs):
+    deleting_ids("questions").add(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+def question_changed(sender, instance, raw=False, **kwargs):
+    content_changed(instance.test_id, raw)
+
+    previous_test_id = getattr(instance, "_previous_test_id", None)
+    if previous_test_id != instance.test_id:
+        content_changed(previous_test_id)
+
+
+@receiver(post_delete, sender=Question)
+def question_deleted(sender, instance, **kwargs):
+    deleting_ids("questions").discard(instance.pk)
+    if instance.test_id not in deleting_ids("tests"):
+        content_changed(instance.test_id)
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def answer_changed(sender, instance, raw=False, **kwargs):
+    # Deleted along with its question: the question's delete republishes
+    if kwargs["signal"] is post_delete and instance.question_id in deleting_ids("questions"):
+        return
+
+    test_id = Question.objects.filter(pk=instance.question_id).values_list("test_id", flat=True).first()
+    content_changed(test_id, raw)
+
+
+@receiver(post_delete, sender=Test)
+def test_deleted(sender, instance, **kwargs):
+    deleting_ids("tests").discard(instance.pk)
+
+
+# -----------------------------
+# ATTEMPT CHANGES: CERTIFICATE VERIFICATION + DASHBOARD STATS
+# -----------------------------
+@receiver(post_save, sender=UserTestAttempt)
+@receiver(post_delete, sender=UserTestAttempt)
+def attempt_changed(sender, instance, **kwargs):
+    attempt_id, user_id = instance.pk, instance.user_id
+
+    # After commit, so a concurrent read can't cache the pre-completion state
+    def invalidate():
+        invalidate_verification(attempt_id)
+        invalidate_dashboard_stats(user_id)
+
+    transaction.on_commit(invalidate)
@@ -0,0 +1,155 @@
+# quizzes/stats.py
+
+from django.db import transaction
+
+from .models import UserStats, UserTestAttempt
+
+
+# -----------------------------
+# INCREMENTAL UPDATE
+# -----------------------------
+# UserStats holds running totals so dashboards never scan a user's history.
+# The IQ mean/variance use Welford's update, which is exact and numerically
+# stable one sample at a time.
+
+def add_attempt(stats, iq_score, score_percentage, category_results, end_time):
+    """Fold one completed attempt into `stats` in memory (does not save)."""
+    stats.attempt_count += 1
+    delta = iq_score - stats.iq_mean
+    stats.iq_mean += delta / stats.attempt_count
+    stats.iq_m2 += delta * (iq_score - stats.iq_mean)
+
+    stats.best_iq = max(stats.best_iq, iq_score)
+    stats.score_sum += score_percentage
+
+    for cat in category_results:
+        totals = stats.category_totals.setdefault(cat["name"], {"correct": 0, "total": 0})
+        totals["correct"] += cat["correct"]
+        totals["total"] += cat["total"]
+
+    if stats.last_attempt_at is None or end_time >= stats.last_attempt_at:
+        stats.last_iq = iq_score
+        stats.last_attempt_at = end_time
+
+
+def record_attempt(attempt, result):
+    """
+    Add a just-completed attempt to its user's stats. Call inside the
+    transaction that completes the attempt; the row lock serializes
+    concurrent submissions by the same user.
+    """
+    with transaction.atomic():
+        stats, created = UserStats.objects.select_for_update().get_or_create(user_id=attempt.user_id)
+        if created:
+            # A user's first row is built from their history, which already
+            # includes this attempt
+            for row in completed_attempts().filter(user_id=attempt.user_id).iterator():
+                add_row(stats, *row[1:])
+        else:
+            add_attempt(
+                stats,
+                result["iq_score"],
+                result["score_percentage"],
+                result["category_results"],
+                attempt.end_time,
+            )
+        stats.save()
+    return stats
+
+
+def get_user_stats(user_id):
+    """
+    The user's stats row. Users who predate UserStats get it built from their
+    history on first read, and users with no attempts get an empty one, so the
+    history is scanned at most once per user.
+    """
+    stats = UserStats.objects.filter(user_id=user_id).first()
+    if stats is not None:
+        return stats
+
+    with transaction.atomic():
+        # The row lock record_attempt takes: a submission committed first is
+        # part of the history read here, a later one waits and adds itself
+        stats, created = UserStats.objects.select_for_update().get_or_create(user_id=user_id)
+        if created:
+            for row in completed_attempts().filter(user_id=user_id).iterator():
+                add_row(stats, *row[1:])
+            stats.save()
+    return stats
+
+
+# -----------------------------
+# BACKFILL
+# -----------------------------
+def completed_attempts():
+    """(user_id, iq_score, score, end_time, category_results) rows, oldest first per user."""
+    return (
+        UserTestAttempt.objects
+        .filter(is_completed=True, end_time__isnull=False)
+        .order_by("user_id", "end_time", "id")
+        .values_list("user_id", "iq_score", "score", "end_time", "result__category_results")
+    )
+
+
+def add_row(stats, iq_score, score, end_time, category_results):
+    """add_attempt for a completed_attempts() row (without its user_id)."""
+    add_attempt(stats, int(iq_score), score, category_results or [], end_time)
+
+
+def rebuild_user_stats(user_ids=None, batch_size=1000):
+    """
+    Recompute UserStats from completed attempts, oldest first, in one pass
+    over the attempts table. Attempts from before TestResult existed have no
+    category breakdown and only count towards the IQ and accuracy totals.
+    Returns the number of users written.
+    """
+    attempts = completed_attempts()
+    stale = UserStats.objects.all()
+    if user_ids is not None:
+        attempts = attempts.filter(user_id__in=user_ids)
+        stale = stale.filter(user_id__in=user_ids)
+
+    with transaction.atomic():
+        # Users whose attempts were all deleted must not keep old totals
+        stale.delete()
+        return rebuild_from(attempts, batch_size)
+
+
+def rebuild_from(attempts, batch_size):
+    batch = []
+    written = 0
+    current = None
+
+    for user_id, iq_score, score, end_time, category_results in attempts.iterator(chunk_size=batch_size):
+        if current is None or current.user_id != user_id:
+            if current is not None:
+                batch.append(current)
+            current = UserStats(user_id=user_id, category_totals={})
+
+        add_row(current, iq_score, score, end_time, category_results)
+
+        if len(batch) >= batch_size:
+            written += save_stats(batch)
+            batch = []
+
+    if current is not None:
+        batch.append(current)
+    written += save_stats(batch)
+
+    return written
+
+
+def save_stats(rows):
+    if not rows:
+        return 0
+
+    UserStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["user"],
+        update_fields=[
+            "attempt_count", "iq_mean", "iq_m2", "best_iq", "last_iq",
+            "score_sum", "category_totals", "last_attempt_at", "updated_at",
+        ],
+    )
+    return len(rows)
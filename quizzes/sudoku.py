@@ -0,0 +1,303 @@
+# quizzes/sudoku.py
+
+import random
+
+# Grids are 81-character strings, row by row, "0" for an empty cell.
+# The solver works on a list of 81 candidate masks: bit d-1 set means digit
+# d is still possible in that cell, and a single-bit mask is a placed digit.
+
+ALL_DIGITS = 0x1FF
+
+# Clue counts per difficulty level (codes as in models.DIFFICULTY_LEVELS);
+# fewer givens means more deduction is needed
+DIFFICULTY_CLUES = {
+    "E": 40,
+    "M": 32,
+    "H": 26,
+}
+
+ROW = [i // 9 for i in range(81)]
+COL = [i % 9 for i in range(81)]
+BOX = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+
+# The 27 rows, columns and boxes, and the 20 cells sharing a unit with each cell
+UNITS = (
+    [[r * 9 + c for c in range(9)] for r in range(9)]
+    + [[r * 9 + c for r in range(9)] for c in range(9)]
+    + [[i for i in range(81) if BOX[i] == b] for b in range(9)]
+)
+PEERS = [
+    sorted({j for j in range(81) if j != i and (ROW[j] == ROW[i] or COL[j] == COL[i] or BOX[j] == BOX[i])})
+    for i in range(81)
+]
+
+# Digits present in every possible mask, and each single bit's digit
+MASK_DIGITS = [[d + 1 for d in range(9) if mask >> d & 1] for mask in range(ALL_DIGITS + 1)]
+BIT_DIGIT = {1 << d: d + 1 for d in range(9)}
+
+
+# -----------------------------
+# PARSING
+# -----------------------------
+def parse_grid(text):
+    """List of 81 ints from an 81-character string ("." or "0" for blanks)."""
+    text = text.strip()
+    if len(text) != 81:
+        raise ValueError("A grid needs exactly 81 cells")
+    return [0 if ch in ".0" else int(ch) for ch in text]
+
+
+def format_grid(cells):
+    return "".join(str(v) for v in cells)
+
+
+def as_rows(text):
+    """9x9 list of ints, the shape templates iterate over."""
+    return [[int(ch) for ch in text[r * 9:(r + 1) * 9]] for r in range(9)]
+
+
+# -----------------------------
+# SOLVER
+# -----------------------------
+# Constraint propagation (naked and hidden singles) to a fixpoint, then
+# depth-first search on the cell with the fewest candidates, propagating
+# again after every guess. Most generated puzzles fall to propagation alone.
+
+def conflicts(cells):
+    """Indices of filled cells that clash with another filled cell in a unit."""
+    bad = set()
+    for unit in UNITS:
+        seen = {}
+        for i in unit:
+            v = cells[i]
+            if not v:
+                continue
+            if v in seen:
+                bad.update((i, seen[v]))
+            else:
+                seen[v] = i
+    return bad
+
+
+def propagate(cand, queue):
+    """
+    Eliminate placed digits (the cells in `queue`) from their peers and
+    place hidden singles until nothing changes. Works in place; returns
+    False on a contradiction.
+    """
+    while True:
+        while queue:
+            i = queue.pop()
+            bit = cand[i]
+            for p in PEERS[i]:
+                c = cand[p]
+                if c & bit:
+                    c &= ~bit
+                    if not c:
+                        return False
+                    cand[p] = c
+                    if not c & (c - 1):
+                        queue.append(p)
+
+        # Hidden singles: a digit with only one possible cell in a unit
+        for unit in UNITS:
+            once = twice = placed = 0
+            for i in unit:
+                c = cand[i]
+                twice |= once & c
+                once |= c
+                if not c & (c - 1):
+                    placed |= c
+            if once != ALL_DIGITS:
+                return False
+
+            singles = once & ~twice & ~placed
+            while singles:
+                bit = singles & -singles
+                singles ^= bit
+                for i in unit:
+                    if cand[i] & bit:
+                        cand[i] = bit
+                        queue.append(i)
+                        break
+
+        if not queue:
+            return True
+
+
+def candidates(cells):
+    """Propagated candidate masks for a grid of ints, or None if it is contradictory."""
+    if conflicts(cells):
+        return None
+
+    cand = [ALL_DIGITS] * 81
+    queue = []
+    for i, v in enumerate(cells):
+        if v:
+            cand[i] = 1 << (v - 1)
+            queue.append(i)
+
+    return cand if propagate(cand, queue) else None
+
+
+def search(cand, limit, found, rng=None):
+    """Appends solved grids (lists of ints) to `found` until there are `limit`."""
+    best, best_count = -1, 10
+    for i in range(81):
+        c = cand[i]
+        if c & (c - 1):
+            count = len(MASK_DIGITS[c])
+            if count < best_count:
+                best, best_count = i, count
+                if count == 2:
+                    break
+
+    if best < 0:
+        found.append([BIT_DIGIT[c] for c in cand])
+        return
+
+    digits = MASK_DIGITS[cand[best]]
+    if rng is not None:
+        digits = rng.sample(digits, len(digits))
+
+    for d in digits:
+        guess = cand[:]
+        guess[best] = 1 << (d - 1)
+        if propagate(guess, [best]):
+            search(guess, limit, found, rng)
+            if len(found) >= limit:
+                return
+
+
+def solutions(cells, limit=2, rng=None):
+    """Up to `limit` solutions of a grid (list of ints), as lists of ints."""
+    cand = candidates(cells)
+    if cand is None:
+        return []
+    found = []
+    search(cand, limit, found, rng)
+    return found
+
+
+def solve(text):
+    """Solved grid string, or None if the puzzle has no solution."""
+    found = solutions(parse_grid(text), limit=1)
+    return format_grid(found[0]) if found else None
+
+
+def has_unique_solution(cells):
+    return len(solutions(cells, limit=2)) == 1
+
+
+# -----------------------------
+# CHECKING + HINTS
+# -----------------------------
+def check(givens, cells, solution):
+    """
+    Compare a player's grid with the puzzle's solution (all lists of ints).
+    Returns clashing cells, cells that disagree with the solution, and
+    whether the grid is complete and solved.
+    """
+    wrong = [i for i in range(81) if cells[i] and not givens[i] and cells[i] != solution[i]]
+    complete = all(cells)
+    return {
+        "conflicts": sorted(conflicts(cells)),
+        "wrong": wrong,
+        "complete": complete,
+        "solved": complete and cells == solution,
+    }
+
+
+def hint(cells, solution):
+    """
+    Next move for a player's grid as {"index", "value", "reason"}, or None
+    when the grid is solved. Wrong entries are corrected first; otherwise a
+    naked or hidden single is preferred over just revealing a cell.
+    """
+    for i in range(81):
+        if cells[i] and cells[i] != solution[i]:
+            return {"index": i, "value": solution[i], "reason": "wrong"}
+
+    empty = [i for i in range(81) if not cells[i]]
+    if not empty:
+        return None
+
+    # Candidates from placed digits only: the deductions a player can see
+    cand = {}
+    for i in empty:
+        used = 0
+        for p in PEERS[i]:
+            if cells[p]:
+                used |= 1 << (cells[p] - 1)
+        cand[i] = ALL_DIGITS & ~used
+
+    for i in empty:
+        if len(MASK_DIGITS[cand[i]]) == 1:
+            return {"index": i, "value": BIT_DIGIT[cand[i]], "reason": "naked_single"}
+
+    for unit in UNITS:
+        for d in range(1, 10):
+            bit = 1 << (d - 1)
+            spots = [i for i in unit if not cells[i] and cand[i] & bit]
+            if len(spots) == 1:
+                return {"index": spots[0], "value": d, "reason": "hidden_single"}
+
+    i = min(empty, key=lambda j: len(MASK_DIGITS[cand[j]]))
+    return {"index": i, "value": solution[i], "reason": "reveal"}
+
+
+# -----------------------------
+# GENERATOR
+# -----------------------------
+def random_solution(rng):
+    return solutions([0] * 81, limit=1, rng=rng)[0]
+
+
+def dig(solution, target, rng):
+    """
+    Remove clues in symmetric pairs from a full grid, keeping a removal only
+    if the puzzle stays unique, until `target` clues remain or no pair can go.
+    """
+    puzzle = solution[:]
+    clues = 81
+
+    order = list(range(41))  # cell 40 is the centre, its own mirror
+    rng.shuffle(order)
+    for i in order:
+        if clues <= target:
+            break
+
+        pair = {i, 80 - i}
+        saved = [(j, puzzle[j]) for j in pair]
+        for j in pair:
+            puzzle[j] = 0
+
+        if has_unique_solution(puzzle):
+            clues -= len(pair)
+        else:
+            for j, v in saved:
+                puzzle[j] = v
+
+    return puzzle, clues
+
+
+def generate(difficulty="M", rng=None, tries=5):
+    """
+    (puzzle, solution) strings for a new puzzle with exactly one solution
+    and the difficulty's clue count. Some full grids cannot be dug that far;
+    after `tries` grids the sparsest unique puzzle found is returned.
+    """
+    rng = rng or random.Random()
+    target = DIFFICULTY_CLUES[difficulty]
+
+    best = None
+    for _ in range(tries):
+        solution = random_solution(rng)
+        puzzle, clues = dig(solution, target, rng)
+        if best is None or clues < best[0]:
+            best = (clues, puzzle, solution)
+        if clues <= target:
+            break
+
+    _, puzzle, solution = best
+    return format_grid(puzzle), format_grid(solution)
@@ -1,3 +1,1323 @@
-from django.test import TestCase
+import json
+import random
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest.mock import patch
 
-# Create your tests here.
+import qrcode
+from asgiref.sync import sync_to_async
+
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import ai_client, logic_puzzles, sudoku
+from .ai_client import AIUnavailable, CircuitBreaker
+from .attempts import ANSWER_GRACE_SECONDS, save_answers
+from .blueprint import get_blueprint
+from .buffers import WriteBuffer
+from .certificates import QR_SIZE, qr_modules, render_certificate, verification_token
+from .dashboard import attempt_history, attempt_page, decode_cursor, encode_cursor
+from .feedback import (
+    MAX_TASK_ATTEMPTS, STALE_TASK_AFTER, UNAVAILABLE_RETRY_BASE, UNAVAILABLE_RETRY_MAX,
+    cached_ai_feedback, claim_next_task, enqueue_feedback, feedback_cache_key,
+    process_next_task, store_cached_feedback, unavailable_backoff,
+)
+from .models import (
+    Answer, FeedbackCacheEntry, FeedbackTask, GameScore, PracticeAttempt, Question, ScoreClaim, SudokuPuzzle, Test,
+    TestResult, UserAnswer, UserStats, UserTestAttempt,
+)
+from .practice import (
+    ADAPT_MIN_ANSWERS, SCORE_ONCE_TIMEOUT, SUDOKU_HINT_PENALTY, SUDOKU_POINTS, answers_match, score_buffer,
+)
+from .rankings import (
+    IQ_MAX, IQ_MIN, LEADERBOARD_SIZE, get_histogram, get_leaderboard, histogram_from_attempts,
+    percentile_rank, record_score,
+)
+from .scoring import _answer_keys, score_attempt
+from .signals import pending_publishes
+from .stats import get_user_stats, rebuild_user_stats
+from .views import requested_range
+
+
+def make_test(rng, questions=24, choices=4):
+    """A test with questions spread over every category and difficulty."""
+    # Rolled-back test classes reuse ids, so drop answer keys memoized for them
+    _answer_keys.clear()
+    test = Test.objects.create(title="Sample", duration=30)
+    categories = ["NR", "VR", "LR", "SR", "MR"]
+    for n in range(questions):
+        question = Question.objects.create(
+            test=test,
+            text=f"Question {n}",
+            category=categories[n % len(categories)],
+            difficulty="EMH"[n % 3],
+        )
+        correct = rng.randrange(choices)
+        for c in range(choices):
+            # One save each, as in the admin: the signals republish the answer key
+            Answer.objects.create(question=question, text=f"Choice {c}", is_correct=c == correct)
+    # Test cases never commit, so these publishes stay pending and would swallow
+    # a test's own; the key is published lazily on first use instead
+    pending_publishes().clear()
+    return test
+
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+
+STATS_FIELDS = [
+    "attempt_count", "iq_mean", "iq_m2", "best_iq", "last_iq", "score_sum", "category_totals", "last_attempt_at",
+]
+
+
+def answer_randomly(rng, user, test):
+    """An unsubmitted attempt with a random choice (or none) for every question."""
+    attempt = UserTestAttempt.objects.create(user=user, test=test)
+    rows = []
+    for question in Question.objects.filter(test=test).prefetch_related("answer_set"):
+        if rng.random() < 0.1:
+            continue  # left unanswered
+        rows.append(UserAnswer(
+            attempt=attempt,
+            question=question,
+            selected_answer=rng.choice(list(question.answer_set.all())),
+        ))
+    UserAnswer.objects.bulk_create(rows)
+    return attempt
+
+
+# -----------------------------
+# CERTIFICATE DOWNLOAD RANGES
+# -----------------------------
+class RequestedRangeTests(SimpleTestCase):
+    etag = '"abc"'
+    size = 1000
+
+    def byte_range(self, **headers):
+        request = RequestFactory().get("/", headers=headers)
+        return requested_range(request, self.etag, self.size)
+
+    def test_no_range_sends_everything(self):
+        self.assertIsNone(self.byte_range())
+
+    def test_closed_range(self):
+        self.assertEqual(self.byte_range(Range="bytes=0-99"), (0, 99))
+
+    def test_end_is_clamped_to_the_file(self):
+        self.assertEqual(self.byte_range(Range="bytes=900-5000"), (900, 999))
+
+    def test_open_ended_range(self):
+        self.assertEqual(self.byte_range(Range="bytes=100-"), (100, 999))
+
+    def test_suffix_range(self):
+        self.assertEqual(self.byte_range(Range="bytes=-100"), (900, 999))
+        self.assertEqual(self.byte_range(Range="bytes=-5000"), (0, 999))
+
+    def test_unsatisfiable(self):
+        self.assertIs(self.byte_range(Range="bytes=1000-"), False)
+        self.assertIs(self.byte_range(Range="bytes=-0"), False)
+
+    def test_unsupported_or_malformed_ranges_are_ignored(self):
+        for header in ["bytes=0-1,5-6", "bytes=-", "bytes=50-10", "items=0-1", "bytes=a-b"]:
+            with self.subTest(header=header):
+                self.assertIsNone(self.byte_range(Range=header))
+
+    def test_if_range(self):
+        self.assertEqual(self.byte_range(Range="bytes=10-19", If_Range=self.etag), (10, 19))
+        self.assertIsNone(self.byte_range(Range="bytes=10-19", If_Range='"stale"'))
+
+
+class CertificateDownloadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(1)
+        cls.user = User.objects.create_user("ada", password="x")
+        cls.test = make_test(rng)
+        cls.attempt = answer_randomly(rng, cls.user, cls.test)
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+        self.client.force_login(self.user)
+        self.client.get(reverse("test_submit", args=[self.attempt.id]))
+        self.url = reverse("download_certificate", args=[self.attempt.id])
+
+    def test_full_partial_and_unsatisfiable(self):
+        full = self.client.get(self.url)
+        self.assertEqual(full.status_code, 200)
+        body = b"".join(full.streaming_content)
+        self.assertTrue(body.startswith(b"%PDF"))
+        size = len(body)
+
+        part = self.client.get(self.url, headers={"Range": "bytes=-100", "If-Range": full["ETag"]})
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part["Content-Range"], f"bytes {size - 100}-{size - 1}/{size}")
+        self.assertEqual(b"".join(part.streaming_content), body[-100:])
+
+        beyond = self.client.get(self.url, headers={"Range": f"bytes={size}-"})
+        self.assertEqual(beyond.status_code, 416)
+        self.assertEqual(beyond["Content-Range"], f"bytes */{size}")
+
+        changed = self.client.get(self.url, headers={"Range": "bytes=0-9", "If-Range": '"other"'})
+        self.assertEqual(changed.status_code, 200)
+
+    def test_rendered_once_and_revalidated_by_etag(self):
+        with patch("quizzes.certificates.render_certificate", wraps=render_certificate) as render:
+            first = self.client.get(self.url)
+            b"".join(first.streaming_content)
+            again = self.client.get(self.url)
+            b"".join(again.streaming_content)
+            self.assertEqual(render.call_count, 1)
+
+        self.assertEqual(again["ETag"], first["ETag"])
+        self.assertEqual(first["Cache-Control"], "private, no-cache")
+        unchanged = self.client.get(self.url, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged.content, b"")
+
+        stale = self.client.get(self.url, headers={"If-None-Match": '"other"'})
+        self.assertEqual(stale.status_code, 200)
+
+    def test_only_the_owner_downloads(self):
+        self.client.force_login(User.objects.create_user("mallory", password="x"))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class GenerateCertificatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(9)
+        cls.user = User.objects.create_user("katherine", password="x")
+        cls.test = make_test(rng, questions=5)
+        cls.attempts = []
+        for _ in range(3):
+            attempt = answer_randomly(rng, cls.user, cls.test)
+            attempt.is_completed = True
+            attempt.end_time = timezone.now()
+            attempt.iq_score = 100
+            attempt.save()
+            cls.attempts.append(attempt)
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media))
+
+    def generate(self, *args):
+        out = StringIO()
+        call_command("generate_certificates", "--workers=1", *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def stored(self):
+        return {a.id: default_storage.listdir(f"certificates/{a.id}")[1] for a in self.attempts}
+
+    def test_renders_once_then_skips(self):
+        self.assertIn("3 certificates to render, 0 already up to date", self.generate())
+        first = self.stored()
+        self.assertTrue(all(len(files) == 1 for files in first.values()))
+
+        self.assertIn("0 certificates to render, 3 already up to date", self.generate())
+        self.assertEqual(self.stored(), first)
+
+    def test_force_re_renders(self):
+        self.generate()
+        before = {a.id: default_storage.get_modified_time(f"certificates/{a.id}/{self.stored()[a.id][0]}")
+                  for a in self.attempts}
+
+        self.assertIn("3 certificates to render, 0 already up to date", self.generate("--force"))
+        for attempt in self.attempts:
+            files = self.stored()[attempt.id]
+            self.assertEqual(len(files), 1)
+            self.assertGreater(default_storage.get_modified_time(f"certificates/{attempt.id}/{files[0]}"), before[attempt.id])
+
+    def test_filters_by_date(self):
+        tomorrow = (timezone.now() + timedelta(days=1)).date().isoformat()
+        self.assertIn("0 certificates to render", self.generate(f"--from={tomorrow}"))
+        with self.assertRaisesMessage(CommandError, "--from must not be after --to"):
+            self.generate(f"--from={tomorrow}", "--to=2000-01-01")
+
+
+# -----------------------------
+# CERTIFICATE VERIFICATION
+# -----------------------------
+class QrModulesTests(SimpleTestCase):
+    def test_rectangles_match_the_encoder_matrix(self):
+        for url in ["https://example.com/certificate/verify/1/abc/", "http://localhost:8000/" + "x" * 120]:
+            qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=4)
+            qr.add_data(url)
+            qr.make(fit=True)
+            matrix = qr.get_matrix()
+
+            size = len(matrix)
+            module = QR_SIZE / size
+            drawn = [[False] * size for _ in range(size)]
+            for x, y, width, height in qr_modules(url):
+                self.assertAlmostEqual(height, module)
+                row = size - 1 - round(y / module)
+                col = round(x / module)
+                for c in range(col, col + round(width / module)):
+                    self.assertFalse(drawn[row][c], "modules overlap")
+                    drawn[row][c] = True
+
+            with self.subTest(url=url):
+                self.assertEqual(drawn, matrix)
+
+
+class VerifyCertificateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(10)
+        cls.owner = User.objects.create_user("mary", password="x")
+        cls.test = make_test(rng, questions=5)
+        cls.attempt = answer_randomly(rng, cls.owner, cls.test)
+        cls.attempt.is_completed = True
+        cls.attempt.end_time = timezone.now()
+        cls.attempt.iq_score = 112
+        cls.attempt.save()
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("verify_certificate", args=[self.attempt.id, verification_token(self.attempt.id)])
+
+    def test_page_is_the_same_for_every_visitor(self):
+        anonymous = self.client.get(self.url)
+        self.assertContains(anonymous, "mary")
+        self.assertIn("public", anonymous["Cache-Control"])
+
+        self.client.force_login(User.objects.create_user("viewer", password="x"))
+        signed_in = self.client.get(self.url)
+        self.assertEqual(signed_in.content, anonymous.content)
+        self.assertNotContains(signed_in, "viewer")
+        self.assertNotIn("Cookie", signed_in.get("Vary", ""))
+        self.assertNotIn(settings.CSRF_COOKIE_NAME, signed_in.cookies)
+
+    def test_unknown_or_forged_certificates(self):
+        forged = reverse("verify_certificate", args=[self.attempt.id, "0" * 12])
+        self.assertEqual(self.client.get(forged).status_code, 404)
+
+        missing = reverse("verify_certificate", args=[self.attempt.id + 1000, verification_token(self.attempt.id + 1000)])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+
+# -----------------------------
+# ATTEMPT HISTORY
+# -----------------------------
+class AttemptPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("radia", password="x")
+        test = make_test(random.Random(11), questions=1)
+        start = timezone.now() - timedelta(days=30)
+        # Pairs share an end time, so the id has to break the tie
+        UserTestAttempt.objects.bulk_create([
+            UserTestAttempt(user=cls.user, test=test, is_completed=True, end_time=start + timedelta(hours=n // 2))
+            for n in range(25)
+        ])
+        UserTestAttempt.objects.create(user=cls.user, test=test)  # unfinished, never listed
+
+    def test_pages_cover_the_history_once_in_order(self):
+        expected = list(attempt_history(self.user.id).values_list("id", flat=True))
+        seen, cursor = [], None
+        while True:
+            rows, cursor = attempt_page(self.user.id, cursor, page_size=4)
+            seen += [row.id for row in rows]
+            if cursor is None:
+                break
+        self.assertEqual(len(expected), 25)
+        self.assertEqual(seen, expected)
+
+    def test_cursor_round_trip(self):
+        attempt = attempt_history(self.user.id).first()
+        self.assertEqual(decode_cursor(encode_cursor(attempt)), (attempt.end_time, attempt.id))
+
+    def test_malformed_cursor_starts_over(self):
+        first_page, _ = attempt_page(self.user.id)
+        for cursor in ["", "abc", "1-2-3", "99999999999999999999999-1"]:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(attempt_page(self.user.id, cursor)[0], first_page)
+
+    def test_dashboard_links_the_next_page(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("user_dashboard"))
+        next_cursor = response.context["next_cursor"]
+        self.assertContains(response, f"?before={next_cursor}")
+
+        older = self.client.get(reverse("user_dashboard"), {"before": next_cursor})
+        self.assertEqual(
+            [a.id for a in older.context["completed_attempts"]],
+            [a.id for a in attempt_page(self.user.id, next_cursor)[0]],
+        )
+
+
+# -----------------------------
+# USER STATS
+# -----------------------------
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rng = random.Random(3)
+        cls.user = User.objects.create_user("alan", password="x")
+        cls.test = make_test(cls.rng)
+
+    def submit(self):
+        attempt = answer_randomly(self.rng, self.user, self.test)
+        self.client.get(reverse("test_submit", args=[attempt.id]))
+
+    def assertMatchesRebuild(self):
+        incremental = UserStats.objects.get(user=self.user)
+        rebuild_user_stats([self.user.id])
+        rebuilt = UserStats.objects.get(user=self.user)
+        for field in STATS_FIELDS:
+            with self.subTest(field=field):
+                self.assertEqual(getattr(incremental, field), getattr(rebuilt, field))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_incremental_matches_a_full_rebuild(self):
+        for _ in range(8):
+            self.submit()
+        self.assertEqual(UserStats.objects.get(user=self.user).attempt_count, 8)
+        self.assertMatchesRebuild()
+
+    def test_new_row_starts_from_past_attempts(self):
+        for _ in range(3):
+            self.submit()
+        UserStats.objects.filter(user=self.user).delete()  # predates UserStats
+
+        self.submit()
+        self.assertEqual(UserStats.objects.get(user=self.user).attempt_count, 4)
+        self.assertMatchesRebuild()
+
+    def test_first_read_builds_the_row_once(self):
+        for _ in range(3):
+            self.submit()
+        UserStats.objects.filter(user=self.user).delete()  # predates UserStats
+
+        self.assertEqual(get_user_stats(self.user.id).attempt_count, 3)
+        self.assertMatchesRebuild()
+        with self.assertNumQueries(1):
+            get_user_stats(self.user.id)
+
+    def test_users_without_attempts_get_an_empty_row(self):
+        newcomer = User.objects.create_user("ida", password="x")
+        self.assertEqual(get_user_stats(newcomer.id).attempt_count, 0)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_user_stats(newcomer.id).attempt_count, 0)
+
+
+# -----------------------------
+# RANKINGS
+# -----------------------------
+class PercentileRankTests(SimpleTestCase):
+    def counts(self, *scores):
+        counts = [0] * (IQ_MAX - IQ_MIN + 1)
+        for iq in scores:
+            counts[iq - IQ_MIN] += 1
+        return counts
+
+    def test_share_of_the_others_strictly_below(self):
+        counts = self.counts(90, 100, 100, 110, 120)
+        self.assertEqual(percentile_rank(counts, 90), 0)
+        self.assertEqual(percentile_rank(counts, 110), 75)  # 3 of the 4 others
+        self.assertEqual(percentile_rank(counts, 100), 25)  # the tie is not below
+        self.assertEqual(percentile_rank(counts, 120), 100)
+
+    def test_alone_has_no_rank(self):
+        self.assertIsNone(percentile_rank(self.counts(100), 100))
+
+    def test_out_of_range_scores_are_clamped(self):
+        counts = self.counts(IQ_MIN, IQ_MAX)
+        self.assertEqual(percentile_rank(counts, IQ_MAX + 40), 100)
+
+
+class RankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test = make_test(random.Random(12), questions=1)
+        cls.users = [User.objects.create_user(f"player{n}", password="x") for n in range(LEADERBOARD_SIZE + 2)]
+        for n, user in enumerate(cls.users):
+            cls.complete(user, 100 + n)
+            cls.complete(user, 90)  # a worse attempt never shows on the board
+
+    @classmethod
+    def complete(cls, user, iq_score):
+        return UserTestAttempt.objects.create(
+            user=user, test=cls.test, is_completed=True, iq_score=iq_score, end_time=timezone.now(),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_histogram_follows_submissions(self):
+        self.assertEqual(get_histogram(self.test.id).counts, histogram_from_attempts(self.test.id))
+
+        attempt = self.complete(self.users[0], 130)
+        record_score(attempt, 130)
+        counts = get_histogram(self.test.id).counts
+        self.assertEqual(counts, histogram_from_attempts(self.test.id))
+        self.assertEqual(sum(counts), 2 * len(self.users) + 1)
+
+    def test_missing_histogram_includes_the_new_attempt_once(self):
+        attempt = self.complete(self.users[0], 130)
+        record_score(attempt, 130)
+        self.assertEqual(get_histogram(self.test.id).counts, histogram_from_attempts(self.test.id))
+
+    def test_leaderboard_is_each_users_best(self):
+        board = get_leaderboard(self.test.id)
+        self.assertEqual(len(board), LEADERBOARD_SIZE)
+        best = sorted(range(100, 100 + len(self.users)), reverse=True)
+        self.assertEqual([e["iq_score"] for e in board], best[:LEADERBOARD_SIZE])
+        self.assertEqual(len({e["user_id"] for e in board}), LEADERBOARD_SIZE)
+
+    def test_only_a_qualifying_score_invalidates_the_board(self):
+        get_leaderboard(self.test.id)
+
+        low = self.complete(self.users[0], 61)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            record_score(low, 61)
+        self.assertEqual(callbacks, [])
+
+        high = self.complete(User.objects.create_user("newcomer", password="x"), 150)
+        with self.captureOnCommitCallbacks(execute=True):
+            record_score(high, 150)
+        self.assertEqual(get_leaderboard(self.test.id)[0]["username"], "newcomer")
+
+
+# -----------------------------
+# SUDOKU
+# -----------------------------
+PUZZLE = "530070000600195000098000060800060003400803001700020006060000280000419005000080079"
+SOLUTION = "534678912672195348198342567859761423426853791713924856961537284287419635345286179"
+
+
+class SudokuTests(SimpleTestCase):
+    def test_solves_a_known_puzzle(self):
+        self.assertEqual(sudoku.solve(PUZZLE), SOLUTION)
+        self.assertTrue(sudoku.has_unique_solution(sudoku.parse_grid(PUZZLE)))
+
+    def test_detects_several_solutions_and_none(self):
+        self.assertEqual(len(sudoku.solutions([0] * 81, limit=2)), 2)
+        clash = "55" + PUZZLE[2:]
+        self.assertIsNone(sudoku.solve(clash))
+
+    def test_generated_puzzles_are_unique_and_match_their_solution(self):
+        rng = random.Random(7)
+        for difficulty in sudoku.DIFFICULTY_CLUES:
+            puzzle, solution = sudoku.generate(difficulty, rng=rng)
+            cells = sudoku.parse_grid(puzzle)
+            self.assertEqual(sudoku.solutions(cells, limit=2), [sudoku.parse_grid(solution)])
+            self.assertTrue(all(not g or g == s for g, s in zip(cells, sudoku.parse_grid(solution))))
+
+    def test_check(self):
+        givens, solution = sudoku.parse_grid(PUZZLE), sudoku.parse_grid(SOLUTION)
+        self.assertTrue(sudoku.check(givens, solution, solution)["solved"])
+
+        cells = list(solution)
+        cells[2] = 5  # clashes with the given 5 in row 0
+        result = sudoku.check(givens, cells, solution)
+        self.assertEqual(result["wrong"], [2])
+        self.assertIn(2, result["conflicts"])
+        self.assertTrue(result["complete"])
+        self.assertFalse(result["solved"])
+
+    def test_hint_corrects_mistakes_first(self):
+        cells = sudoku.parse_grid(PUZZLE)
+        cells[80] = 1
+        self.assertEqual(
+            sudoku.hint(cells, sudoku.parse_grid(SOLUTION)),
+            {"index": 80, "value": 9, "reason": "wrong"},
+        )
+
+    def test_hints_fill_the_grid_with_the_solution(self):
+        cells, solution = sudoku.parse_grid(PUZZLE), sudoku.parse_grid(SOLUTION)
+        while (move := sudoku.hint(cells, solution)) is not None:
+            self.assertFalse(cells[move["index"]])
+            self.assertEqual(move["value"], solution[move["index"]])
+            self.assertIn(move["reason"], {"naked_single", "hidden_single"})
+            cells[move["index"]] = move["value"]
+        self.assertEqual(cells, solution)
+
+
+# -----------------------------
+# LOGIC PUZZLES
+# -----------------------------
+class LogicPuzzleTests(SimpleTestCase):
+    def test_solves_each_rule_family(self):
+        self.assertEqual(logic_puzzles.solve([3, 7, 11, 15]), 19)
+        self.assertEqual(logic_puzzles.solve([2, 6, 18, 54]), 162)
+        self.assertEqual(logic_puzzles.solve([1, 1, 2, 3, 5, 8]), 13)
+        self.assertEqual(logic_puzzles.solve([1, 2, 4, 7, 11]), 16)
+        self.assertEqual(logic_puzzles.solve([1, 10, 2, 20, 3, 40]), 4)
+
+    def test_ambiguous_or_unknown_sequences_have_no_answer(self):
+        # Fibonacci says 13, a constant second difference says 12
+        self.assertIsNone(logic_puzzles.solve([2, 3, 5, 8]))
+        self.assertIsNone(logic_puzzles.solve([4, 1, 7]))  # no rule fits
+
+    def test_verify(self):
+        self.assertTrue(logic_puzzles.verify("arithmetic", [3, 7, 11, 15], 19))
+        self.assertFalse(logic_puzzles.verify("arithmetic", [3, 7, 11, 15], 20))
+        self.assertFalse(logic_puzzles.verify("geometric", [10, 100, 1000, 10000], 100000))  # past MAX_TERM
+        self.assertFalse(logic_puzzles.verify("letters", [20, 22, 24, 26], 28))  # past Z
+
+    def test_generated_puzzles_verify(self):
+        rng = random.Random(13)
+        for kind in logic_puzzles.GENERATORS:
+            for difficulty in "EMH":
+                with self.subTest(kind=kind, difficulty=difficulty):
+                    kind_, question, answer = logic_puzzles.generate(difficulty, kind, rng=rng)
+                    shown = question.removeprefix("What comes next? ").removesuffix(", ?").split(", ")
+                    if kind == "letters":
+                        terms = [logic_puzzles.LETTERS.index(t) + 1 for t in shown]
+                        answer = logic_puzzles.LETTERS.index(answer) + 1
+                    else:
+                        terms, answer = [int(t) for t in shown], int(answer)
+                    self.assertEqual(kind_, kind)
+                    self.assertTrue(logic_puzzles.verify(kind, terms, answer))
+
+    def test_answers_match(self):
+        for given, expected in [("  q ", "Q"), ("1,024", "1024"), ("32.0", "32"), ("- 46", "-46"), ("0.1", "0.10")]:
+            with self.subTest(given=given):
+                self.assertTrue(answers_match(given, expected))
+        for given, expected in [("33", "32"), ("abd", "abc"), ("nan", "32"), ("", "0")]:
+            with self.subTest(given=given):
+                self.assertFalse(answers_match(given, expected))
+
+
+# -----------------------------
+# WRITE BUFFERS
+# -----------------------------
+BUFFER_CACHES = {
+    "default": {"BACKEND": LOCMEM, "LOCATION": "tests-default"},
+    "write_buffers": {"BACKEND": LOCMEM, "LOCATION": "tests-write-buffers"},
+}
+
+
+class BufferTestMixin:
+    def setUp(self):
+        caches["write_buffers"].clear()
+        self.user = User.objects.create_user("edsger", password="x")
+        self.flushed = []
+        self.buffer = WriteBuffer("test_scores", GameScore, max_items=5, max_age=60, on_flush=self.flushed.extend)
+
+    def add(self, score, user=None):
+        self.buffer.add(user_id=(user or self.user).id, game_name="memory", score=score, played_at=timezone.now())
+
+    def scores(self):
+        return sorted(GameScore.objects.values_list("score", flat=True))
+
+
+@override_settings(CACHES=BUFFER_CACHES)
+class WriteBufferTests(BufferTestMixin, TestCase):
+    def test_flushes_at_max_items(self):
+        for score in range(4):
+            self.add(score)
+        self.assertEqual(self.scores(), [])
+        self.assertEqual(self.buffer.pending(), 4)
+
+        self.add(4)
+        self.assertEqual(self.scores(), [0, 1, 2, 3, 4])
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(len(self.flushed), 5)
+
+    def test_flushes_at_max_age(self):
+        self.add(1)
+        caches["write_buffers"].set(self.buffer.key("oldest"), time.time() - 61, None)
+        self.add(2)
+        self.assertEqual(self.scores(), [1, 2])
+
+    def test_explicit_flush(self):
+        self.add(1)
+        self.add(2)
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(self.scores(), [1, 2])
+
+    def test_a_gap_waits_one_flush_then_is_skipped(self):
+        self.add(1)
+        caches["write_buffers"].incr(self.buffer.key("seq"))  # number taken, row never stored
+        self.add(3)
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.scores(), [1])
+        self.assertEqual(self.buffer.pending(), 2)
+
+        self.assertEqual(self.buffer.flush(), 1)
+        self.assertEqual(self.scores(), [1, 3])
+        self.assertEqual(self.buffer.pending(), 0)
+
+    @override_settings(CACHES={"default": {"BACKEND": LOCMEM}})
+    def test_writes_directly_without_a_buffer_cache(self):
+        self.add(1)
+        self.assertEqual(self.scores(), [1])
+        self.assertEqual(self.buffer.pending(), 0)
+        self.assertEqual(len(self.flushed), 1)
+
+
+# Foreign keys are only checked at commit, so this needs real transactions
+@override_settings(CACHES=BUFFER_CACHES)
+class WriteBufferIntegrityTests(BufferTestMixin, TransactionTestCase):
+    def test_rows_of_deleted_users_are_dropped(self):
+        gone = User.objects.create_user("gone", password="x")
+        self.add(1)
+        self.add(2, user=gone)
+        self.add(3)
+        gone.delete()
+
+        self.assertEqual(self.buffer.flush(), 2)
+        self.assertEqual(self.scores(), [1, 3])
+        self.assertEqual(self.buffer.pending(), 0)
+
+
+# -----------------------------
+# PRACTICE SCORES
+# -----------------------------
+class SudokuScoringTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("joan", password="x")
+        cls.puzzle = SudokuPuzzle.objects.create(
+            difficulty="M", slot=0, puzzle=PUZZLE, solution=SOLUTION, clues=81 - PUZZLE.count("0"),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def ask(self, action, cells=PUZZLE):
+        response = self.client.post(
+            reverse("sudoku_check"),
+            {"puzzle_id": self.puzzle.pk, "cells": cells, "action": action},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def scores(self):
+        score_buffer.flush()
+        return list(GameScore.objects.filter(user=self.user, game_name="sudoku").values_list("score", flat=True))
+
+    def test_validate_reports_clashes_but_not_wrong_cells(self):
+        # Cell 2 is empty in the puzzle; 2 is wrong (4 solves it) but clashes with nothing
+        result = self.ask("validate", PUZZLE[:2] + "2" + PUZZLE[3:])
+        self.assertEqual(set(result), {"status", "conflicts", "complete", "solved"})
+        self.assertEqual(result["conflicts"], [])
+
+        result = self.ask("validate", PUZZLE[:2] + "5" + PUZZLE[3:])
+        self.assertIn(2, result["conflicts"])
+
+    def test_hints_lower_the_score_across_workers(self):
+        self.ask("hint")
+        self.ask("hint")
+        cache.clear()  # another worker with its own cache
+        self.assertTrue(self.ask("validate", SOLUTION)["solved"])
+        self.assertEqual(self.scores(), [round(SUDOKU_POINTS["M"] * (1 - 2 * SUDOKU_HINT_PENALTY))])
+
+    def test_a_puzzle_scores_once(self):
+        self.ask("validate", SOLUTION)
+        cache.clear()
+        self.ask("validate", SOLUTION)
+        self.assertEqual(self.scores(), [SUDOKU_POINTS["M"]])
+
+        # Until the window passes; the slot may hold a new puzzle by then
+        ScoreClaim.objects.filter(user=self.user).update(
+            scored_at=timezone.now() - timedelta(seconds=SCORE_ONCE_TIMEOUT + 1),
+        )
+        self.ask("validate", SOLUTION)
+        self.assertEqual(self.scores(), [SUDOKU_POINTS["M"]] * 2)
+
+
+# -----------------------------
+# ASYNC VIEWS
+# -----------------------------
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("lynn", password="x")
+        cls.test = make_test(random.Random(14), questions=1)
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_sudoku_fills_an_empty_pool_inline(self):
+        response = await self.async_client.get(reverse("sudoku_game"), {"difficulty": "X"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["difficulty"], "M")
+        self.assertEqual(await SudokuPuzzle.objects.filter(difficulty="M").acount(), 1)
+
+        again = await self.async_client.get(reverse("sudoku_game"))
+        self.assertEqual(again.context["puzzle"].pk, response.context["puzzle"].pk)
+
+    async def test_puzzle_level_follows_recent_answers(self):
+        anonymous = await self.async_client.get(reverse("puzzle_game"))
+        self.assertEqual(anonymous.context["difficulty"], "M")
+
+        await PracticeAttempt.objects.abulk_create([
+            PracticeAttempt(
+                user=self.user, question=f"Q{n}", difficulty="M", kind="arithmetic",
+                answer="1", is_correct=True, answered_at=timezone.now(),
+            )
+            for n in range(ADAPT_MIN_ANSWERS)
+        ])
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("puzzle_game"))
+        self.assertEqual(response.context["difficulty"], "H")
+        self.assertEqual(response.context["puzzle"].difficulty, "H")
+
+    async def test_feedback_poll(self):
+        result = await sync_to_async(make_result)(self.user, self.test)
+        url = reverse("test_feedback", args=[result.pk])
+
+        anonymous = await self.async_client.get(url)
+        self.assertEqual(anonymous.status_code, 302)
+        self.assertTrue(anonymous["Location"].startswith(settings.LOGIN_URL))
+
+        other = await sync_to_async(User.objects.create_user)("nosy", password="x")
+        await self.async_client.aforce_login(other)
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+
+        await self.async_client.aforce_login(self.user)
+        self.assertEqual((await self.async_client.get(url)).json(), {"ready": False, "feedback": ""})
+
+        await TestResult.objects.filter(pk=result.pk).aupdate(ai_feedback="Well done.")
+        self.assertEqual((await self.async_client.get(url)).json(), {"ready": True, "feedback": "Well done."})
+
+
+# -----------------------------
+# RESULTS SNAPSHOT
+# -----------------------------
+class TestResultsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(4)
+        cls.user = User.objects.create_user("barbara", password="x")
+        cls.test = make_test(rng)
+        cls.attempt = answer_randomly(rng, cls.user, cls.test)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_submit_scores_once(self):
+        url = reverse("test_submit", args=[self.attempt.id])
+        self.assertRedirects(self.client.get(url), reverse("test_results", args=[self.attempt.id]))
+        end_time = UserTestAttempt.objects.get(pk=self.attempt.pk).end_time
+
+        self.client.get(url)
+        self.assertEqual(UserTestAttempt.objects.get(pk=self.attempt.pk).end_time, end_time)
+        self.assertEqual(FeedbackTask.objects.count(), 1)
+
+    def test_backfill_uses_the_template_and_queues_feedback_on_view(self):
+        UserTestAttempt.objects.filter(pk=self.attempt.pk).update(
+            is_completed=True, end_time=timezone.now(), score=40.0, iq_score=95,
+        )
+        backfill = import_module("quizzes.migrations.0014_backfill_testresults").backfill_results
+        backfill(django_apps, None)
+
+        result = TestResult.objects.get(pk=self.attempt.pk)
+        self.assertEqual((result.score_percentage, result.iq_score), (40.0, 95))
+        self.assertIn("**Strengths**", result.ai_feedback)
+        self.assertFalse(FeedbackTask.objects.exists())
+
+        for _ in range(2):
+            response = self.client.get(reverse("test_results", args=[self.attempt.id]))
+            self.assertContains(response, "Strengths")
+        self.assertEqual(FeedbackTask.objects.filter(result=result).count(), 1)
+
+    def test_results_of_other_users_are_hidden(self):
+        self.client.get(reverse("test_submit", args=[self.attempt.id]))
+        self.client.force_login(User.objects.create_user("mallory", password="x"))
+        self.assertEqual(self.client.get(reverse("test_results", args=[self.attempt.id])).status_code, 404)
+
+
+# -----------------------------
+# FEEDBACK WORKER
+# -----------------------------
+CATEGORY_RESULTS = [
+    {"name": "Numerical", "correct": 4, "total": 5, "iq": 140},
+    {"name": "Verbal", "correct": 1, "total": 5, "iq": 80},
+]
+
+
+def make_result(user, test, iq_score=100, category_results=CATEGORY_RESULTS):
+    attempt = UserTestAttempt.objects.create(
+        user=user, test=test, is_completed=True, end_time=timezone.now(), iq_score=iq_score,
+    )
+    return TestResult.objects.create(
+        attempt=attempt,
+        correct_count=5,
+        total_questions=10,
+        score_percentage=50.0,
+        iq_score=iq_score,
+        category_results=category_results,
+    )
+
+
+class FeedbackWorkerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("katherine", password="x")
+        cls.test = Test.objects.create(title="Sample", duration=30)
+
+    def setUp(self):
+        cache.clear()
+
+    def drain(self):
+        call_command("run_feedback_worker", "--once", stdout=StringIO())
+
+    @patch("quizzes.feedback.generate_ai_feedback", return_value="Gemini report")
+    def test_worker_writes_the_report(self, generate):
+        task = enqueue_feedback(make_result(self.user, self.test))
+        self.drain()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, FeedbackTask.DONE)
+        self.assertEqual(task.result.ai_feedback, "Gemini report")
+        self.assertIsNone(process_next_task())
+
+    @patch("quizzes.feedback.generate_ai_feedback", side_effect=ValueError("bad response"))
+    def test_errors_are_retried_then_fall_back_to_the_template(self, generate):
+        task = enqueue_feedback(make_result(self.user, self.test))
+        for _ in range(MAX_TASK_ATTEMPTS - 1):
+            process_next_task()
+            task.refresh_from_db()
+            self.assertEqual(task.status, FeedbackTask.PENDING)
+            self.assertFalse(task.result.ai_feedback)
+
+        process_next_task()
+        task.refresh_from_db()
+        self.assertEqual(task.status, FeedbackTask.FAILED)
+        self.assertIn("bad response", task.last_error)
+        self.assertIn("**Strengths**", TestResult.objects.get(pk=task.result_id).ai_feedback)
+        self.assertEqual(generate.call_count, MAX_TASK_ATTEMPTS)
+
+    def test_tasks_of_dead_workers_are_reclaimed(self):
+        task = enqueue_feedback(make_result(self.user, self.test))
+        self.assertEqual(claim_next_task(), task)
+        self.assertIsNone(claim_next_task())  # still running
+
+        FeedbackTask.objects.filter(pk=task.pk).update(locked_at=timezone.now() - STALE_TASK_AFTER)
+        self.assertEqual(claim_next_task(), task)
+
+    def test_oldest_task_first(self):
+        first = enqueue_feedback(make_result(self.user, self.test))
+        enqueue_feedback(make_result(self.user, self.test))
+        self.assertEqual(claim_next_task(), first)
+
+
+# -----------------------------
+# FEEDBACK CACHE
+# -----------------------------
+class FeedbackCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_key_ignores_category_order_and_number_types(self):
+        reordered = [dict(c, correct=float(c["correct"])) for c in reversed(CATEGORY_RESULTS)]
+        self.assertEqual(
+            feedback_cache_key(100, CATEGORY_RESULTS, 5, 10),
+            feedback_cache_key(100.0, reordered, 5, 10),
+        )
+        self.assertNotEqual(
+            feedback_cache_key(100, CATEGORY_RESULTS, 5, 10),
+            feedback_cache_key(101, CATEGORY_RESULTS, 5, 10),
+        )
+
+    @patch("quizzes.feedback.generate_ai_feedback", return_value="Gemini report")
+    def test_same_profile_calls_gemini_once(self, generate):
+        for _ in range(3):
+            self.assertEqual(cached_ai_feedback(100, CATEGORY_RESULTS, 5, 10), "Gemini report")
+        cache.clear()  # the table outlives the Django cache
+        self.assertEqual(cached_ai_feedback(100, CATEGORY_RESULTS, 5, 10), "Gemini report")
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual(FeedbackCacheEntry.objects.get().hits, 1)
+
+    @patch("quizzes.feedback.generate_ai_feedback", return_value="Gemini report")
+    def test_expired_entries_are_regenerated(self, generate):
+        cached_ai_feedback(100, CATEGORY_RESULTS, 5, 10)
+        FeedbackCacheEntry.objects.update(created_at=timezone.now() - timedelta(seconds=settings.FEEDBACK_CACHE_TTL + 1))
+        cache.clear()
+        cached_ai_feedback(100, CATEGORY_RESULTS, 5, 10)
+        self.assertEqual(generate.call_count, 2)
+
+    @override_settings(FEEDBACK_CACHE_MAX_ENTRIES=2)
+    def test_least_recently_used_entries_are_evicted(self):
+        store_cached_feedback("a", "A")
+        store_cached_feedback("b", "B")
+        FeedbackCacheEntry.objects.filter(pk="a").update(last_used_at=timezone.now() + timedelta(minutes=1))
+        store_cached_feedback("c", "C")
+        self.assertEqual(sorted(FeedbackCacheEntry.objects.values_list("pk", flat=True)), ["a", "c"])
+
+
+# -----------------------------
+# GEMINI CLIENT
+# -----------------------------
+def gemini_response(text):
+    part = SimpleNamespace(text=text)
+    return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=[part]))])
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_and_lets_one_probe_through(self):
+        breaker = CircuitBreaker(threshold=2, reset_after=60)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+        with patch("quizzes.ai_client.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertTrue(breaker.allow())  # half-open probe
+            self.assertFalse(breaker.allow())
+
+        breaker.record_success()
+        self.assertTrue(breaker.allow())
+
+
+@override_settings(GEMINI_MAX_RETRIES=2, GEMINI_BACKOFF_BASE=0, GEMINI_DEADLINE=5)
+class GenerateTextTests(SimpleTestCase):
+    def setUp(self):
+        ai_client.breaker.record_success()
+        self.addCleanup(ai_client.breaker.record_success)
+        patcher = patch("quizzes.ai_client.get_model")
+        self.model = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def test_retries_until_a_call_succeeds(self):
+        self.model.generate_content.side_effect = [TimeoutError(), gemini_response(" report ")]
+        self.assertEqual(ai_client.generate_text("prompt"), "report")
+        self.assertEqual(self.model.generate_content.call_count, 2)
+
+    def test_raises_unavailable_and_opens_the_breaker(self):
+        self.model.generate_content.side_effect = TimeoutError()
+        for _ in range(settings.GEMINI_BREAKER_THRESHOLD):
+            with self.assertRaises(AIUnavailable):
+                ai_client.generate_text("prompt")
+        self.assertEqual(self.model.generate_content.call_count, 3 * settings.GEMINI_BREAKER_THRESHOLD)
+
+        with self.assertRaises(AIUnavailable):
+            ai_client.generate_text("prompt")
+        self.assertEqual(self.model.generate_content.call_count, 3 * settings.GEMINI_BREAKER_THRESHOLD)
+
+
+class FeedbackOutageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("margaret", password="x")
+        cls.test = Test.objects.create(title="Sample", duration=30)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_outage_shows_the_template_and_retries_later(self):
+        task = enqueue_feedback(make_result(self.user, self.test))
+        with patch("quizzes.feedback.generate_ai_feedback", side_effect=AIUnavailable("down")):
+            process_next_task()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, FeedbackTask.PENDING)
+        self.assertGreater(task.not_before, timezone.now())
+        self.assertIn("**Strengths**", task.result.ai_feedback)
+        self.assertIsNone(claim_next_task())  # backing off
+
+        FeedbackTask.objects.filter(pk=task.pk).update(not_before=timezone.now())
+        with patch("quizzes.feedback.generate_ai_feedback", return_value="Gemini report"):
+            process_next_task()
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, FeedbackTask.DONE)
+        self.assertEqual(TestResult.objects.get(pk=task.result_id).ai_feedback, "Gemini report")
+
+    def test_backoff_grows_to_a_cap(self):
+        self.assertEqual(unavailable_backoff(1), UNAVAILABLE_RETRY_BASE)
+        self.assertEqual(unavailable_backoff(3), UNAVAILABLE_RETRY_BASE * 4)
+        self.assertEqual(unavailable_backoff(50), UNAVAILABLE_RETRY_MAX)
+
+    def test_gives_up_after_a_week(self):
+        task = enqueue_feedback(make_result(self.user, self.test))
+        FeedbackTask.objects.filter(pk=task.pk).update(created_at=timezone.now() - timedelta(days=8))
+        with patch("quizzes.feedback.generate_ai_feedback", side_effect=AIUnavailable("down")):
+            process_next_task()
+        task.refresh_from_db()
+        self.assertEqual(task.status, FeedbackTask.FAILED)
+
+
+# -----------------------------
+# TEST BLUEPRINT
+# -----------------------------
+class BlueprintTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.test = make_test(random.Random(5), questions=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def blueprint(self):
+        return get_blueprint(Test.objects.get(pk=self.test.pk))
+
+    def test_hides_correct_answers(self):
+        question = self.blueprint()["questions"][0]
+        self.assertEqual(set(question["answers"][0]), {"id", "text"})
+
+    def test_cached_until_the_content_changes(self):
+        self.blueprint()
+        with self.assertNumQueries(1):  # the test row only
+            self.blueprint()
+
+        # No cache entry is deleted: another worker's copy must go stale by version
+        question = Question.objects.filter(test=self.test).first()
+        question.text = "Edited"
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+        self.assertEqual(self.blueprint()["questions"][0]["text"], "Edited")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Answer.objects.create(question=question, text="Added")
+        self.assertIn("Added", [a["text"] for a in self.blueprint()["questions"][0]["answers"]])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            question.delete()
+        self.assertEqual(len(self.blueprint()["questions"]), 2)
+
+    def test_moved_questions_leave_the_old_test(self):
+        other = Test.objects.create(title="Other", duration=30)
+        self.blueprint()
+        question = Question.objects.filter(test=self.test).first()
+        question.test = other
+        with self.captureOnCommitCallbacks(execute=True):
+            question.save()
+        self.assertEqual(len(self.blueprint()["questions"]), 2)
+        self.assertEqual(len(get_blueprint(Test.objects.get(pk=other.pk))["questions"]), 1)
+
+
+# -----------------------------
+# TEST RUNNER
+# -----------------------------
+class TestRunnerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("frances", password="x")
+        cls.other = User.objects.create_user("eve", password="x")
+        cls.test = make_test(random.Random(6), questions=3)
+        cls.questions = list(Question.objects.filter(test=cls.test).order_by("id").prefetch_related("answer_set"))
+
+    def setUp(self):
+        cache.clear()
+        self.attempt = UserTestAttempt.objects.create(user=self.user, test=self.test)
+        self.client.force_login(self.user)
+
+    def post_answers(self, answers):
+        return self.client.post(
+            reverse("attempt_answers", args=[self.attempt.id]),
+            json.dumps({"answers": answers}),
+            content_type="application/json",
+        )
+
+    def saved(self):
+        return dict(UserAnswer.objects.filter(attempt=self.attempt).values_list("question_id", "selected_answer_id"))
+
+    def choice(self, question_index, answer_index=0):
+        return self.questions[question_index].answer_set.all()[answer_index].id
+
+    def test_payload(self):
+        self.post_answers({self.questions[0].id: self.choice(0)})
+        payload = self.client.get(reverse("attempt_payload", args=[self.attempt.id])).json()
+        self.assertEqual([q["id"] for q in payload["questions"]], [q.id for q in self.questions])
+        self.assertEqual(payload["answers"], {str(self.questions[0].id): self.choice(0)})
+        self.assertGreater(payload["remaining_time"], 0)
+
+    def test_answers_of_other_questions_and_tests_are_dropped(self):
+        other_test = make_test(random.Random(7), questions=1)
+        foreign = Question.objects.get(test=other_test)
+        response = self.post_answers({
+            self.questions[0].id: self.choice(1),                     # another question's answer
+            foreign.id: foreign.answer_set.first().id,                # another test's question
+            self.questions[2].id: self.choice(2),
+        })
+        self.assertEqual(response.json()["saved"], 1)
+        self.assertEqual(self.saved(), {self.questions[2].id: self.choice(2)})
+
+    def test_rejects_bad_payloads(self):
+        url = reverse("attempt_answers", args=[self.attempt.id])
+        self.assertEqual(self.client.post(url, "{", content_type="application/json").status_code, 400)
+        self.assertEqual(self.post_answers({"x": 1}).status_code, 400)
+
+    def test_completed_or_expired_attempts_are_closed(self):
+        UserTestAttempt.objects.filter(pk=self.attempt.pk).update(
+            start_time=timezone.now() - timedelta(minutes=self.test.duration, seconds=ANSWER_GRACE_SECONDS + 1),
+        )
+        self.assertEqual(self.post_answers({self.questions[0].id: self.choice(0)}).status_code, 409)
+
+        UserTestAttempt.objects.filter(pk=self.attempt.pk).update(start_time=timezone.now(), is_completed=True)
+        self.assertEqual(self.post_answers({self.questions[0].id: self.choice(0)}).status_code, 409)
+
+        response = self.client.post(reverse("take_question", args=[self.attempt.id, 1]), {"answer": self.choice(0)})
+        self.assertRedirects(response, reverse("test_submit", args=[self.attempt.id]), fetch_redirect_response=False)
+        self.assertEqual(self.saved(), {})
+
+    def test_other_users_cannot_read_or_answer(self):
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse("attempt_payload", args=[self.attempt.id])).status_code, 404)
+        self.assertEqual(self.post_answers({self.questions[0].id: self.choice(0)}).status_code, 404)
+        response = self.client.post(reverse("take_question", args=[self.attempt.id, 1]), {"answer": self.choice(0)})
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.saved(), {})
+
+    def test_take_question_saves_and_moves_on(self):
+        response = self.client.post(reverse("take_question", args=[self.attempt.id, 1]), {"answer": self.choice(0)})
+        self.assertRedirects(response, reverse("take_question", args=[self.attempt.id, 2]))
+        self.assertEqual(self.saved(), {self.questions[0].id: self.choice(0)})
+
+
+# -----------------------------
+# ANSWER UPSERT
+# -----------------------------
+class SaveAnswersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("hedy", password="x")
+        cls.test = make_test(random.Random(8), questions=3)
+        cls.questions = list(Question.objects.filter(test=cls.test).order_by("id").prefetch_related("answer_set"))
+
+    def setUp(self):
+        self.attempt = UserTestAttempt.objects.create(user=self.user, test=self.test)
+
+    def saved(self):
+        return dict(UserAnswer.objects.filter(attempt=self.attempt).values_list("question_id", "selected_answer_id"))
+
+    def test_one_statement_inserts_and_updates(self):
+        first, second = [list(q.answer_set.all()) for q in self.questions[:2]]
+        with self.assertNumQueries(1):
+            save_answers(self.attempt, {self.questions[0].id: first[0].id, self.questions[1].id: None})
+        with self.assertNumQueries(1):
+            save_answers(self.attempt, {self.questions[0].id: first[1].id, self.questions[1].id: second[0].id})
+
+        self.assertEqual(self.saved(), {self.questions[0].id: first[1].id, self.questions[1].id: second[0].id})
+        self.assertEqual(UserAnswer.objects.filter(attempt=self.attempt).count(), 2)
+
+    def test_nothing_to_save_runs_no_query(self):
+        with self.assertNumQueries(0):
+            save_answers(self.attempt, {})
+
+    def test_one_row_per_question(self):
+        UserAnswer.objects.create(attempt=self.attempt, question=self.questions[0])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserAnswer.objects.create(attempt=self.attempt, question=self.questions[0])
+
+
+# -----------------------------
+# QUERY PLAN BENCHMARK
+# -----------------------------
+class BenchmarkQueryPlansTests(TestCase):
+    def test_refuses_the_default_database_without_debug(self):
+        with self.assertRaisesMessage(CommandError, "Refusing to drop indexes"):
+            call_command("benchmark_query_plans", stdout=StringIO())
+        self.assertFalse(Test.objects.exists())
+
+
+# -----------------------------
+# SCORING
+# -----------------------------
+def score_by_joins(attempt):
+    """The scoring test_submit did before the answer key, one join per count."""
+    questions = Question.objects.filter(test=attempt.test)
+    user_answers = UserAnswer.objects.filter(attempt=attempt).select_related("selected_answer", "question")
+    correct = [ua for ua in user_answers if ua.selected_answer and ua.selected_answer.is_correct]
+
+    weights = {"E": 1, "M": 2, "H": 3}
+    max_weight = sum(weights[q.difficulty] for q in questions)
+    ratio = sum(weights[ua.question.difficulty] for ua in correct) / max_weight if max_weight else 0
+    total = questions.count()
+
+    categories = []
+    for code, name in [("NR", "Numerical"), ("VR", "Verbal"), ("LR", "Logical"), ("SR", "Spatial"), ("MR", "Memory")]:
+        total_cat = questions.filter(category=code).count()
+        if total_cat:
+            correct_cat = user_answers.filter(question__category=code, selected_answer__is_correct=True).count()
+            categories.append({
+                "name": name,
+                "correct": correct_cat,
+                "total": total_cat,
+                "iq": int(60 + correct_cat / total_cat * 100),
+            })
+
+    return {
+        "correct_count": len(correct),
+        "score_percentage": round(len(correct) / total * 100, 1) if total else 0,
+        "iq_score": max(60, min(160, int(100 + 15 * (ratio - 0.5) * 3.2))),
+        "category_results": categories,
+    }
+
+
+class ScoringTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.rng = random.Random(2)
+        cls.user = User.objects.create_user("grace", password="x")
+        cls.test = make_test(cls.rng)
+
+    def setUp(self):
+        _answer_keys.clear()
+
+    def assertScoresMatch(self, attempt):
+        attempt = UserTestAttempt.objects.select_related("test").get(pk=attempt.pk)
+        new = score_attempt(attempt)
+        self.assertEqual({k: new[k] for k in ["correct_count", "score_percentage", "iq_score", "category_results"]},
+                         score_by_joins(attempt))
+
+    def test_matches_the_old_algorithm(self):
+        for _ in range(20):
+            self.assertScoresMatch(answer_randomly(self.rng, self.user, self.test))
+
+    def test_follows_answer_edits(self):
+        attempt = answer_randomly(self.rng, self.user, self.test)
+        self.assertScoresMatch(attempt)
+
+        # Make the first choice the correct one on a few questions; the key is republished
+        with self.captureOnCommitCallbacks(execute=True):
+            for question in Question.objects.filter(test=self.test)[:5]:
+                answers = list(question.answer_set.order_by("id"))
+                for answer in answers:
+                    answer.is_correct = answer == answers[0]
+                    answer.save()
+        self.assertScoresMatch(attempt)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Question.objects.filter(test=self.test).first().delete()
+        self.assertScoresMatch(attempt)
+
+    def test_one_publish_per_admin_save(self):
+        question = Question.objects.filter(test=self.test).first()
+        version = Test.objects.get(pk=self.test.pk).answer_key_version
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            question.text = "Edited"
+            question.save()
+            for answer in question.answer_set.all():
+                answer.text += "!"
+                answer.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(Test.objects.get(pk=self.test.pk).answer_key_version, version + 1)
+
+    def test_rolled_back_edits_do_not_block_the_next_publish(self):
+        question = Question.objects.filter(test=self.test).first()
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                question.save()
+                raise IntegrityError
+        self.assertEqual(callbacks, [])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            question.save()
+        self.assertEqual(len(callbacks), 1)
@@ -22,16 +22,24 @@ urlpatterns = [
     # Test flow
     path('test/<int:test_id>/start/', views.test_start, name='test_start'),
     path('attempt/<int:attempt_id>/question/<int:question_num>/', views.take_question, name='take_question'),
+    path('attempt/<int:attempt_id>/payload/', views.attempt_payload, name='attempt_payload'),
+    path('attempt/<int:attempt_id>/answers/', views.attempt_answers, name='attempt_answers'),
     path('test/submit/<int:attempt_id>/', views.test_submit, name='test_submit'),
+    path('attempt/<int:attempt_id>/results/', views.test_results, name='test_results'),
+    path('attempt/<int:attempt_id>/feedback/', views.test_feedback, name='test_feedback'),
     path('attempt/<int:attempt_id>/certificate/', views.download_certificate, name='download_certificate'),
+    path('test/<int:test_id>/leaderboard/', views.leaderboard, name='leaderboard'),
+    path('certificate/verify/<int:attempt_id>/<str:token>/', views.verify_certificate, name='verify_certificate'),
     
     path("practice/", views.practice_home, name="practice_home"),
     path("practice/sudoku/", views.sudoku_game, name="sudoku_game"),
+    path("practice/sudoku/check/", views.sudoku_check, name="sudoku_check"),
 
     # Games
     path('practice/memory/', views.memory_game, name='memory_game'),
     path('practice/memory/save-score/', views.save_memory_score, name='save_memory_score'),
     path("practice/puzzle/", views.puzzle_game, name="puzzle_game"),
+    path("practice/puzzle/check/", views.puzzle_check, name="puzzle_check"),
 
 
 ]
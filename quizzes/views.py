@@ -5,35 +5,33 @@ from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib import messages
 from django.contrib.auth import login as auth_login
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
-from django.db.models import Q
-import os
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.utils import ImageReader
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.platypus import Paragraph
-from io import BytesIO
-import qrcode
-import base64
-from .models import Test, Question, Answer, UserTestAttempt, UserAnswer
-from django.conf import settings
-import google.generativeai as genai
-import requests
-import math
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.colors import HexColor
+from django.contrib.auth.views import redirect_to_login
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.core.files.storage import default_storage
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import content_disposition_header, http_date, quote_etag
+from django.views.decorators.cache import cache_control
+from django.db import transaction
+import re
+from .models import DIFFICULTY_LEVELS, Test, UserTestAttempt, UserAnswer, TestResult, FeedbackTask, SudokuPuzzle, LogicPuzzle
+from .scoring import score_attempt
+from .blueprint import get_blueprint
+from .attempts import ANSWER_GRACE_SECONDS, clean_selections, remaining_seconds, save_answers
+from .feedback import enqueue_feedback
+from .certificates import get_certificate, get_verification, verification_token
+from .dashboard import attempt_page, get_dashboard_stats
+from .stats import record_attempt
+from .rankings import get_histogram, get_leaderboard, percentile_rank, record_score
+from .practice import (
+    aget_practice_stats, arandom_logic_puzzle, arandom_sudoku, count_sudoku_hint,
+    get_best_scores, grade_answer, memory_score, record_game_score, sudoku_once_key, sudoku_points,
+)
+from . import sudoku
 from django.utils import timezone  
 import json
-import random
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.http import require_POST
-from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
-from django.utils import timezone
 # -----------------------------
 # REGISTER VIEW
 # -----------------------------
@@ -102,8 +100,18 @@ def test_start(request, test_id):
 # -----------------------------
 @login_required
 def take_question(request, attempt_id, question_num):
-    attempt = get_object_or_404(UserTestAttempt, pk=attempt_id)
-    questions = Question.objects.filter(test=attempt.test).order_by('id')
+    attempt = get_object_or_404(
+        UserTestAttempt.objects.select_related("test"),
+        pk=attempt_id,
+        user=request.user,
+    )
+
+    # Submitted attempts are read-only; test_submit sends them to the results
+    if attempt.is_completed:
+        return redirect('test_submit', attempt_id=attempt.id)
+
+    # Question content comes from the cached blueprint (no per-page queries)
+    questions = get_blueprint(attempt.test)["questions"]
     total_questions = len(questions)
 
     # Test complete
@@ -111,23 +119,24 @@ def take_question(request, attempt_id, question_num):
         return redirect('test_submit', attempt_id=attempt.id)
 
     question = questions[question_num - 1]
-    answers = Answer.objects.filter(question=question)
+    answers = question["answers"]
 
     # Remaining time logic (timezone-safe)
-    elapsed = (timezone.now() - attempt.start_time).total_seconds()   # ✅ FIXED
-    remaining_time = attempt.test.duration * 60 - elapsed
+    remaining_time = remaining_seconds(attempt)
 
     if remaining_time <= 0:
         return redirect('test_submit', attempt_id=attempt.id)
 
     if request.method == "POST":
-        selected = request.POST.get("answer")
+        try:
+            selected = int(request.POST["answer"])
+        except (KeyError, ValueError):
+            selected = None
 
-        UserAnswer.objects.update_or_create(
-            attempt=attempt,
-            question=question,
-            defaults={"selected_answer_id": selected}
-        )
+        save_answers(attempt, clean_selections(
+            {"questions": [question]},
+            {question["id"]: selected},
+        ))
 
         return redirect('take_question', attempt_id=attempt.id, question_num=question_num + 1)
 
@@ -145,282 +154,310 @@ def take_question(request, attempt_id, question_num):
 
 
 # -----------------------------
-# SUBMIT TEST
+# TEST RUNNER API (JSON)
 # -----------------------------
 @login_required
-def test_submit(request, attempt_id):
-    from django.utils import timezone
+def attempt_payload(request, attempt_id):
+    """Whole test in one response: questions, saved answers and the clock."""
+    attempt = get_object_or_404(
+        UserTestAttempt.objects.select_related("test"),
+        pk=attempt_id,
+        user=request.user,
+    )
+    saved = UserAnswer.objects.filter(attempt=attempt).values_list("question_id", "selected_answer_id")
+
+    return JsonResponse({
+        "attempt_id": attempt.id,
+        "title": attempt.test.title,
+        "is_completed": attempt.is_completed,
+        "remaining_time": max(0, int(remaining_seconds(attempt))),
+        "questions": get_blueprint(attempt.test)["questions"],
+        "answers": {str(question_id): answer_id for question_id, answer_id in saved},
+    })
 
-    attempt = get_object_or_404(UserTestAttempt, pk=attempt_id)
 
-    # Get all questions from this test
-    questions = Question.objects.filter(test=attempt.test)
-    total_questions = questions.count()
+@login_required
+@require_POST
+def attempt_answers(request, attempt_id):
+    """
+    Accepts JSON POST: {"answers": {"<question_id>": <answer_id or null>, ...}}
+    Saves a batch of selections in one request.
+    """
+    attempt = get_object_or_404(
+        UserTestAttempt.objects.select_related("test"),
+        pk=attempt_id,
+        user=request.user,
+    )
 
-    # Fetch all user answers (with selected_answer prefetched)
-    user_answers = UserAnswer.objects.filter(attempt=attempt).select_related("selected_answer", "question")
+    if attempt.is_completed:
+        return JsonResponse({"status": "error", "error": "Attempt already submitted."}, status=409)
+    if remaining_seconds(attempt) < -ANSWER_GRACE_SECONDS:
+        return JsonResponse({"status": "error", "error": "Time is up."}, status=409)
 
-    # ------------------------------
-    # 1. COUNT CORRECT ANSWERS
-    # ------------------------------
-    correct_count = 0
-    for ua in user_answers:
-        if ua.selected_answer and ua.selected_answer.is_correct:
-            correct_count += 1
-
-    # Percentage score
-    if total_questions > 0:
-        score_percentage = round((correct_count / total_questions) * 100, 1)
-    else:
-        score_percentage = 0
+    try:
+        payload = json.loads(request.body.decode("utf-8"))
+        selections = {
+            int(question_id): None if answer_id is None else int(answer_id)
+            for question_id, answer_id in payload["answers"].items()
+        }
+    except Exception:
+        return HttpResponseBadRequest("Invalid payload")
 
-    # ------------------------------
-    # 2. WEIGHTED SCORING BASED ON DIFFICULTY
-    # ------------------------------
-    difficulty_weights = {"E": 1, "M": 2, "H": 3}
+    selections = clean_selections(get_blueprint(attempt.test), selections)
+    save_answers(attempt, selections)
 
-    weighted_score = 0
-    max_weight = 0
+    return JsonResponse({"status": "ok", "saved": len(selections)})
 
-    for q in questions:
-        max_weight += difficulty_weights[q.difficulty]
 
-    for ua in user_answers:
-        if ua.selected_answer and ua.selected_answer.is_correct:
-            weighted_score += difficulty_weights[ua.question.difficulty]
+# -----------------------------
+# SUBMIT TEST
+# -----------------------------
+@login_required
+def test_submit(request, attempt_id):
+    attempt = get_object_or_404(
+        UserTestAttempt.objects.select_related("test").defer("test__answer_key"),
+        pk=attempt_id,
+        user=request.user,
+    )
 
-    if max_weight > 0:
-        ratio = weighted_score / max_weight  # 0..1 range
-    else:
-        ratio = 0
+    # Already scored: never re-score (or re-bill Gemini) on revisits
+    if TestResult.objects.filter(attempt=attempt).exists():
+        return redirect('test_results', attempt_id=attempt.id)
 
     # ------------------------------
-    # 3. REALISTIC IQ CALCULATION (Gaussian)
+    # 1-4. SCORE (answer key pass, see quizzes/scoring.py)
     # ------------------------------
-    # Convert ratio to Z-score
-    Z = (ratio - 0.5) * 3.2    # spreads nicely across typical human distribution
-
-    # Convert Z-score to IQ (mean=100, std dev=15)
-    iq_score = int(100 + 15 * Z)
-
-    # Hard limits for human IQ range
-    iq_score = max(60, min(160, iq_score))
+    result = score_attempt(attempt)
 
     # ------------------------------
-    # 4. CATEGORY BREAKDOWN
+    # 5. SAVE ATTEMPT + RESULT SNAPSHOT (once)
     # ------------------------------
-    categories = {
-        "NR": "Numerical",
-        "VR": "Verbal",
-        "LR": "Logical",
-        "SR": "Spatial",
-        "MR": "Memory",
-    }
+    with transaction.atomic():
+        attempt = UserTestAttempt.objects.select_for_update().get(pk=attempt.pk)
 
-    category_results = []
+        # Completed without a snapshot (before TestResult existed, and not yet
+        # backfilled): keep the score, end time and stats it already has
+        if attempt.is_completed:
+            result["score_percentage"] = attempt.score
+            result["iq_score"] = int(attempt.iq_score)
 
-    for code, name in categories.items():
-        cat_questions = questions.filter(category=code)
-        total_cat = cat_questions.count()
+        test_result, created = TestResult.objects.get_or_create(
+            attempt=attempt,
+            defaults={
+                "correct_count": result["correct_count"],
+                "total_questions": result["total_questions"],
+                "score_percentage": result["score_percentage"],
+                "iq_score": result["iq_score"],
+                "category_results": result["category_results"],
+            },
+        )
+        if created:
+            if not attempt.is_completed:
+                attempt.score = result["score_percentage"]
+                attempt.iq_score = result["iq_score"]
+                attempt.end_time = timezone.now()
+                attempt.is_completed = True
+                attempt.save(update_fields=["score", "iq_score", "end_time", "is_completed"])
+                record_attempt(attempt, result)
+                record_score(attempt, result["iq_score"])
 
-        if total_cat == 0:
-            continue
+            # ------------------------------
+            # 6. AI FEEDBACK (queued, see run_feedback_worker)
+            # ------------------------------
+            enqueue_feedback(test_result)
 
-        correct_cat = user_answers.filter(
-            question__category=code,
-            selected_answer__is_correct=True
-        ).count()
+    return redirect('test_results', attempt_id=attempt.id)
 
-        # Category IQ scaling
-        cat_ratio = correct_cat / total_cat
-        cat_iq = int(60 + cat_ratio * 100)  # simplified for categories
 
-        category_results.append({
-            "name": name,
-            "correct": correct_cat,
-            "total": total_cat,
-            "iq": cat_iq,
-        })
-    # ------------------------------
-    # 5. AI FEEDBACK
-    # ------------------------------
-    ai_feedback = generate_ai_feedback(
-        iq_score,
-        category_results,
-        correct_count,
-        total_questions
+# -----------------------------
+# TEST RESULTS (read-only)
+# -----------------------------
+@login_required
+def test_results(request, attempt_id):
+    result = get_object_or_404(
+        TestResult.objects.select_related("attempt__test", "feedback_task"),
+        pk=attempt_id,
+        attempt__user=request.user,
     )
+    histogram = get_histogram(result.attempt.test_id)
 
-    # ------------------------------
-    # 5. SAVE ATTEMPT
-    # ------------------------------
-    attempt.score = score_percentage
-    attempt.iq_score = iq_score
-    attempt.end_time = timezone.now()
-    attempt.is_completed = True
-    attempt.save()
+    # Backfilled results carry the template report; ask Gemini for the real
+    # one only once someone looks at them
+    try:
+        result.feedback_task
+    except FeedbackTask.DoesNotExist:
+        enqueue_feedback(result)
 
-    # ------------------------------
-    # 6. RENDER RESULTS PAGE
-    # ------------------------------
     return render(request, "quizzes/results.html", {
-        "attempt": attempt,
-        "correct_count": correct_count,
-        "total_questions": total_questions,
-        "score_percentage": score_percentage,
-        "iq_score": iq_score,
-        "category_results": category_results,
-        "ai_feedback": ai_feedback,
+        "attempt": result.attempt,
+        "percentile": percentile_rank(histogram.counts, result.iq_score),
+        "correct_count": result.correct_count,
+        "total_questions": result.total_questions,
+        "score_percentage": result.score_percentage,
+        "iq_score": result.iq_score,
+        "category_results": result.category_results,
+        "ai_feedback": result.ai_feedback,
+        "feedback_pending": not result.ai_feedback,
     })
 
 
-
-
 # -----------------------------
-# DOWNLOAD CERTIFICATE (Premium PDF)
+# AI FEEDBACK STATUS (JSON, polled by results page)
 # -----------------------------
-@login_required
-def download_certificate(request, attempt_id):
-    
-
-    attempt = get_object_or_404(UserTestAttempt, pk=attempt_id)
-
-    # CATEGORY IQ RESULTS (same logic as results page)
-    questions = Question.objects.filter(test=attempt.test)
-    user_answers = UserAnswer.objects.filter(attempt=attempt).select_related("selected_answer", "question")
-
-    categories = {
-        "NR": "Numerical",
-        "VR": "Verbal",
-        "LR": "Logical",
-        "SR": "Spatial",
-        "MR": "Memory",
-    }
-
-    category_results = []
-    for code, name in categories.items():
-        cat_questions = questions.filter(category=code)
-        total_cat = cat_questions.count()
-        if total_cat == 0:
-            continue
-
-        correct_cat = user_answers.filter(
-            question__category=code,
-            selected_answer__is_correct=True
-        ).count()
-
-        cat_ratio = correct_cat / total_cat
-        cat_iq = int(60 + cat_ratio * 100)
-
-        category_results.append((name, correct_cat, total_cat, cat_iq))
-
-    # ----------------------- PDF START -----------------------
-    buffer = BytesIO()
-    pdf = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    # Colors
-    primary = colors.HexColor("#3B82F6")      # Blue
-    dark = colors.HexColor("#0F172A")         # Dark blue-black
-    gray_light = colors.HexColor("#94A3B8")   # Soft gray
-
-    # ----------------------- BACKGROUND -----------------------
-    # Light geometric brain watermark
-    brain_path = os.path.join(settings.BASE_DIR, "static", "img", "brain.png")
-    if os.path.exists(brain_path):
-        pdf.drawImage(
-            ImageReader(brain_path),
-            80, 200,
-            width=450, height=450,
-            mask='auto',
-            preserveAspectRatio=True,
-            anchor='c'
-        )
-
-    # ----------------------- HEADER -----------------------
-    pdf.setFillColor(primary)
-    pdf.rect(0, height - 80, width, 80, fill=1)
-
-    pdf.setFillColor(colors.white)
-    pdf.setFont("Helvetica-Bold", 28)
-    pdf.drawCentredString(width / 2, height - 45, "OFFICIAL IQ CERTIFICATE")
+# Async: every open results page polls this until the worker has written
+# the report, and under ASGI those polls share the event loop instead of
+# each holding a thread. (login_required only wraps async views from
+# Django 5.1, hence the explicit check.)
+async def test_feedback(request, attempt_id):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+
+    result = await (
+        TestResult.objects
+        .filter(pk=attempt_id, attempt__user=user)
+        .values("ai_feedback")
+        .afirst()
+    )
+    if result is None:
+        raise Http404
 
-    # ----------------------- NAME -----------------------
-    pdf.setFillColor(dark)
-    pdf.setFont("Helvetica-Bold", 24)
-    pdf.drawCentredString(width / 2, height - 140, attempt.user.username)
+    return JsonResponse({
+        "ready": bool(result["ai_feedback"]),
+        "feedback": result["ai_feedback"],
+    })
 
-    pdf.setFont("Helvetica", 14)
-    pdf.drawCentredString(width / 2, height - 165, f"has successfully completed")
 
-    # ----------------------- TEST TITLE -----------------------
-    pdf.setFont("Helvetica-Bold", 18)
-    pdf.drawCentredString(width / 2, height - 195, attempt.test.title)
+# -----------------------------
+# DOWNLOAD CERTIFICATE (Premium PDF)
+# -----------------------------
+# Single "bytes=first-last" ranges only; anything else gets the whole file
+BYTE_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
 
-    # ----------------------- IQ SCORE BADGE -----------------------
-    pdf.setFillColor(primary)
-    pdf.circle(width / 2, height - 290, 55, fill=1)
 
-    pdf.setFillColor(colors.white)
-    pdf.setFont("Helvetica-Bold", 36)
-    pdf.drawCentredString(width / 2, height - 300, str(int(attempt.iq_score)))
+def requested_range(request, etag, size):
+    """
+    Inclusive (start, end) of a satisfiable Range header, None to send the
+    whole file, or False when the range lies beyond the end of the file.
+    """
+    header = request.headers.get("Range")
+    # If-Range: only resume when the client still holds this exact version
+    if not header or request.headers.get("If-Range", etag) != etag:
+        return None
+
+    match = BYTE_RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        return (max(size - suffix, 0), size - 1) if suffix else False
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    if end < start:
+        return None
+    return start, end
+
+
+def iter_file_range(file, start, length, chunk_size=FileResponse.block_size):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
 
-    pdf.setFont("Helvetica", 12)
-    pdf.drawCentredString(width / 2, height - 325, "IQ SCORE")
 
-    # ----------------------- CATEGORY TABLE -----------------------
-    y = height - 420
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.setFillColor(dark)
-    pdf.drawString(70, y, "Category Performance")
-    y -= 30
+@login_required
+def download_certificate(request, attempt_id):
+    attempt = get_object_or_404(
+        UserTestAttempt.objects.select_related("user", "test"),
+        pk=attempt_id,
+        user=request.user,
+        is_completed=True,
+    )
 
-    pdf.setFont("Helvetica-Bold", 12)
-    pdf.setFillColor(primary)
-    pdf.drawString(70, y, "Category")
-    pdf.drawString(230, y, "Correct")
-    pdf.drawString(330, y, "Total")
-    pdf.drawString(430, y, "IQ")
-    y -= 20
+    # Stored PDF, re-rendered only when the certificate's inputs change
+    path, digest = get_certificate(attempt)
+    etag = quote_etag(digest)
+    last_modified = default_storage.get_modified_time(path).timestamp()
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    filename = f"iq-certificate-{attempt.id}.pdf"
+    size = default_storage.size(path)
+    byte_range = requested_range(request, etag, size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        # Streams the stored file in blocks and sets Content-Length
+        response = FileResponse(
+            default_storage.open(path, "rb"),
+            content_type="application/pdf",
+            filename=filename,
+        )
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            iter_file_range(default_storage.open(path, "rb"), start, end - start + 1),
+            status=206,
+            content_type="application/pdf",
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+        response["Content-Disposition"] = content_disposition_header(False, filename)
 
-    pdf.setFillColor(dark)
-    pdf.setFont("Helvetica", 12)
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, no-cache"
+    return response
 
-    for name, corr, tot, iq in category_results:
-        pdf.drawString(70, y, name)
-        pdf.drawString(230, y, str(corr))
-        pdf.drawString(330, y, str(tot))
-        pdf.drawString(430, y, str(iq))
-        y -= 22
 
-    # ----------------------- DATE -----------------------
-    pdf.setFont("Helvetica", 12)
-    pdf.setFillColor(gray_light)
-    pdf.drawString(70, 120, f"Date: {attempt.end_time.date()}")
+# -----------------------------
+# LEADERBOARD (best attempt per user, cached)
+# -----------------------------
+@login_required
+def leaderboard(request, test_id):
+    test = get_object_or_404(Test, pk=test_id)
 
-    # ----------------------- SIGNATURE -----------------------
-    pdf.setFillColor(dark)
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(70, 90, "Certified by TestIQ Platform")
+    return render(request, "quizzes/leaderboard.html", {
+        "test": test,
+        "entries": get_leaderboard(test.id),
+    })
 
-    pdf.line(70, 85, 250, 85)
 
-    # ----------------------- QR CODE -----------------------
-    qr_data = f"https://yourdomain.com/certificate/verify/{attempt.id}/"
-    qr_img = qrcode.make(qr_data)
-    qr_buffer = BytesIO()
-    qr_img.save(qr_buffer, format="PNG")
-    qr_buffer.seek(0)
+# -----------------------------
+# VERIFY CERTIFICATE (public, linked from the certificate's QR code)
+# -----------------------------
+VERIFY_MAX_AGE = 60 * 60  # seconds browsers and proxies may reuse the page
 
-    pdf.drawImage(ImageReader(qr_buffer), width - 150, 60, width=80, height=80)
 
-    # ----------------------- FINALIZE -----------------------
-    pdf.showPage()
-    pdf.save()
+@cache_control(public=True, max_age=VERIFY_MAX_AGE)
+def verify_certificate(request, attempt_id, token):
+    if not constant_time_compare(token, verification_token(attempt_id)):
+        raise Http404("Unknown certificate")
 
-    buffer.seek(0)
-    return HttpResponse(buffer, content_type="application/pdf")
+    certificate = get_verification(attempt_id)
+    if certificate is None:
+        raise Http404("Unknown certificate")
 
+    return render(request, "quizzes/verify_certificate.html", {
+        "certificate": certificate,
+    })
 
 
 # -----------------------------
@@ -428,10 +465,16 @@ def download_certificate(request, attempt_id):
 # -----------------------------
 @login_required
 def user_dashboard(request):
-    attempts = UserTestAttempt.objects.filter(user=request.user).order_by("-end_time")
+    stats = get_dashboard_stats(request.user.id)
+    attempts, next_cursor = attempt_page(request.user.id, request.GET.get("before"))
 
     return render(request, "quizzes/user_dashboard.html", {
+        **stats,
+        "iq_scores": json.dumps(stats["iq_scores"]),
+        "iq_labels": json.dumps(stats["iq_labels"]),
         "completed_attempts": attempts,
+        "next_cursor": next_cursor,
+        "is_first_page": "before" not in request.GET,
     })
 
 def landing(request):
@@ -447,69 +490,76 @@ def landing(request):
         "sample_questions": sample_questions
     })
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-def generate_ai_feedback(iq_score, category_results, correct_count, total_questions):
-    categories_text = "\n".join(
-        [f"{c['name']}: {c['correct']}/{c['total']} (IQ {c['iq']})"
-         for c in category_results]
-    )
+def practice_home(request):
+    return render(request, "quizzes/practice_home.html", {
+        "best_scores": get_best_scores(),
+        "my_best_scores": get_best_scores(request.user.id) if request.user.is_authenticated else {},
+    })
 
-    model = genai.GenerativeModel(
-        "gemini-2.5-flash-lite",
-        system_instruction=(
-            "You are an expert psychometric evaluator. Your ONLY task is to generate "
-            "personalized IQ feedback based on the user's test results. "
-            "NEVER introduce yourself. NEVER ask what the user wants. "
-            "NEVER provide general psychology help. Do not explain cognition topics. "
-            "Respond ONLY with structured feedback: strengths, weaknesses, interpretation, "
-            "and improvement plan. Keep length between 180 and 250 words."
-        )
-    )
 
-    prompt = f"""
-    Generate personalized IQ test feedback.
+async def sudoku_game(request):
+    # Served from the local pool (see refill_puzzle_pools), never a remote API.
+    # Async: under ASGI the pool lookup does not tie up a worker thread.
+    difficulty = request.GET.get("difficulty", "M")
+    if difficulty not in sudoku.DIFFICULTY_CLUES:
+        difficulty = "M"
 
-    User results:
-    - IQ Score: {iq_score}
-    - Correct Answers: {correct_count}/{total_questions}
-    - Category Breakdown:
-      {categories_text}
+    request.user = await request.auser()  # base.html reads request.user
+    puzzle = await arandom_sudoku(difficulty)
 
-    Structure your feedback EXACTLY in this format:
+    return render(request, "quizzes/sudoku.html", {
+        "grid": sudoku.as_rows(puzzle.puzzle),
+        "puzzle": puzzle,
+        "difficulty": difficulty,
+        "difficulty_levels": DIFFICULTY_LEVELS,
+    })
 
-    1. **Strengths** — based on performance.
-    2. **Areas to Improve** — based strictly on weaker categories.
-    3. **IQ Interpretation** — short explanation of what their IQ means.
-    4. **Personalized Improvement Plan** — 3–5 bullet points.
+# SUDOKU CHECK / HINT (AJAX)
+@require_POST
+def sudoku_check(request):
+    """
+    Accepts JSON POST: {"puzzle_id": int, "cells": "<81 digits, 0 = empty>", "action": "validate" | "hint"}
+    Reports clashing digits and whether the grid is solved, or returns the next move.
+    Every hint lowers the score a solve earns (see practice.sudoku_points).
     """
-
-    response = model.generate_content(prompt)
-
-    # Extract correctly for your SDK
     try:
-        text = response.candidates[0].content.parts[0].text.strip()
-        return text
-    except Exception as e:
-        print("AI EXTRACT ERROR:", e)
-        return "⚠️ AI feedback could not be generated. Please try again."
-
-
-def practice_home(request):
-    return render(request, "quizzes/practice_home.html")
-
-
-def sudoku_game(request):
-    # Fetch puzzle from free API
-    api_url = "https://sudoku-api.vercel.app/api/dosuku"
-    puzzle = requests.get(api_url).json()
+        payload = json.loads(request.body.decode("utf-8"))
+        puzzle = SudokuPuzzle.objects.get(pk=int(payload["puzzle_id"]))
+        cells = sudoku.parse_grid(str(payload["cells"]))
+        action = payload.get("action", "validate")
+    except Exception:
+        return HttpResponseBadRequest("Invalid payload")
 
-    grid = puzzle["newboard"]["grids"][0]["value"]  # 9x9 grid
+    givens = sudoku.parse_grid(puzzle.puzzle)
+    if action not in ("validate", "hint") or any(g and g != v for g, v in zip(givens, cells)):
+        return HttpResponseBadRequest("Invalid payload")
 
-    return render(request, "quizzes/sudoku.html", {
-        "grid": grid
+    solution = sudoku.parse_grid(puzzle.solution)
+    if action == "hint":
+        move = sudoku.hint(cells, solution)
+        if move is not None:
+            count_sudoku_hint(request.user, puzzle)
+        return JsonResponse({"status": "ok", "hint": move})
+
+    result = sudoku.check(givens, cells, solution)
+    if result["solved"]:
+        points = sudoku_points(request.user, puzzle)
+        if points:
+            record_game_score(
+                request.user, "sudoku", points,
+                once_key=sudoku_once_key(puzzle),
+                difficulty=puzzle.difficulty,
+            )
+
+    # Not which cells are wrong: that is what a (penalised) hint is for
+    return JsonResponse({
+        "status": "ok",
+        "conflicts": result["conflicts"],
+        "complete": result["complete"],
+        "solved": result["solved"],
     })
 
+
 # MEMORY GAME (render)
 def memory_game(request):
     """
@@ -520,13 +570,14 @@ def memory_game(request):
     return render(request, "quizzes/memory_game.html", {"pairs_count": 8})
 
 
-# MEMORY SCORE SAVE (AJAX) - optional persistence
+# MEMORY SCORE SAVE (AJAX)
 @login_required
 @require_POST
 def save_memory_score(request):
     """
     Accepts JSON POST: {"moves": int, "time": seconds, "pairs": int}
-    Saves score for the logged-in user if desired. Returns JSON result.
+    Buffers the score for the logged-in user (see practice.record_game_score);
+    it reaches the database with the next batch. Returns JSON result.
     """
     try:
         payload = json.loads(request.body.decode("utf-8"))
@@ -536,32 +587,59 @@ def save_memory_score(request):
     except Exception:
         return HttpResponseBadRequest("Invalid payload")
 
-    # OPTIONAL: persist to DB if you have a model. For now, just echo back.
+    if moves < 0 or pairs < 0 or not 0 <= time_taken < 86400:
+        return HttpResponseBadRequest("Invalid payload")
+
+    score = memory_score(moves, time_taken, pairs)
+    record_game_score(request.user, "memory", score, moves=moves, time_taken=time_taken, pairs=pairs)
+
     score_data = {
         "user": request.user.username,
         "moves": moves,
         "time": time_taken,
         "pairs": pairs,
+        "score": score,
         "saved_at": timezone.now().isoformat()
     }
 
-    # If you want to store in DB, uncomment and create a model GameScore.
-    # GameScore.objects.create(user=request.user, game_name="memory", moves=moves, time_taken=time_taken, pairs=pairs)
-
     return JsonResponse({"status": "ok", "score": score_data})
 
-def puzzle_game(request):
-    # Fetch puzzle from PuzzleDB API
-    api_url = "https://api.puzzlehub.org/v1/puzzles?type=logic&limit=1"
+async def puzzle_game(request):
+    # Served from the local pool (see refill_puzzle_pools), never a remote API.
+    # Signed-in players without an explicit level get the one their recent
+    # answers suggest.
+    request.user = await request.auser()  # base.html reads request.user
+    stats = await aget_practice_stats(request.user.id) if request.user.is_authenticated else None
+
+    difficulty = request.GET.get("difficulty")
+    if difficulty not in dict(DIFFICULTY_LEVELS):
+        difficulty = stats["suggested_difficulty"] if stats else "M"
+
+    puzzle = await arandom_logic_puzzle(difficulty)
+
+    return render(request, "quizzes/puzzle_game.html", {
+        "puzzle": puzzle,
+        "difficulty": difficulty,
+        "difficulty_levels": DIFFICULTY_LEVELS,
+        "level_stats": stats["levels"].get(difficulty) if stats else None,
+    })
+
+# PUZZLE CHECK (AJAX)
+@require_POST
+def puzzle_check(request):
+    """
+    Accepts JSON POST: {"puzzle_id": int, "answer": str}
+    Grades the answer server-side (the page never sees the solution) and
+    records it for signed-in users.
+    """
     try:
-        response = requests.get(api_url, timeout=5).json()
-        puzzle = response["puzzles"][0]
+        payload = json.loads(request.body.decode("utf-8"))
+        puzzle = LogicPuzzle.objects.get(pk=int(payload["puzzle_id"]))
+        answer = str(payload["answer"]).strip()
     except Exception:
-        puzzle = {
-            "question": "API error. Here's a backup puzzle: What comes next? 2, 4, 8, 16, ?",
-            "answer": "32"
-        }
+        return HttpResponseBadRequest("Invalid payload")
 
-    return render(request, "quizzes/puzzle_game.html", {
-        "puzzle": puzzle
-    })
\ No newline at end of file
+    if not answer:
+        return HttpResponseBadRequest("Invalid payload")
+
+    return JsonResponse({"status": "ok", "correct": grade_answer(puzzle, answer, request.user)})